@@ -1,6 +1,6 @@
 import path from "path";
 import * as fs from "fs";
-import { exec } from "child_process";
+import { execFile } from "child_process";
 import { simpleGit } from "simple-git";
 import { Probot, Context } from "probot";
 import { getDefaultConfig, getInstallationToken, configureGit, clearTempStorage, deleteFolderRecursiveSync } from "./helpers.js";
@@ -26,8 +26,9 @@ export const preCompile = async (app: Probot, context: Context<'pull_request'>)
     let git = simpleGit();
     await configureGit(git, gitAppName, gitAppEmail);
 
-    const baseBranch = payload.pull_request.base.ref;
     const headBranch = payload.pull_request.head.ref;
+    const baseSha = payload.pull_request.base.sha;
+    const headSha = payload.pull_request.head.sha;
 
     let changedFiles: any[] = [];
     let illegalChangedFiles: any[] = [];
@@ -61,10 +62,18 @@ export const preCompile = async (app: Probot, context: Context<'pull_request'>)
         throw error;
     }
     
-    // Step 4: Checkout the source branch
+    // Step 4: Checkout the head commit of the PR
+    // The commit of the event is checked out instead of the branch, so the checked out content is the content that is
+    // compiled in step 7, also when the branch was force-pushed after the event. The branch names are chosen by the
+    // author of the PR, the commits are validated before they are passed to git
     try {
-        context.log.info(`Checking out source branch ${headBranch}`);
-        await git.cwd(cloneTargetDirectory).checkout(headBranch);
+        if (!/^[0-9a-f]{40}$/.test(baseSha) || !/^[0-9a-f]{40}$/.test(headSha)) {
+            throw new Error(`Invalid commit sha in the pull request: ${baseSha}, ${headSha}`);
+        }
+
+        context.log.info(`Checking out commit ${headSha} of source branch ${headBranch}`);
+        await git.cwd(cloneTargetDirectory).fetch(['origin', baseSha, headSha]);
+        await git.cwd(cloneTargetDirectory).checkout(headSha);
     } catch (error) {
         context.log.error(`Error checking out source branch: ${error}`);
         throw error;
@@ -72,13 +81,9 @@ export const preCompile = async (app: Probot, context: Context<'pull_request'>)
 
     // Step 5: Get files changed in the PR
     try {        
-        // Fetch both branches to ensure we have the latest
-        await git.cwd(cloneTargetDirectory).fetch(['origin', baseBranch]);
-        await git.cwd(cloneTargetDirectory).fetch(['origin', headBranch]);
-        
-        // Get the diff between base and head
+        // Get the diff between the base and head commit, the same range that is compiled in step 7
         const diff = await git.cwd(cloneTargetDirectory)
-            .diff([`origin/${baseBranch}...origin/${headBranch}`, '--name-status']);
+            .diff([`${baseSha}...${headSha}`, '--name-status']);
         
         // Parse the diff output into a more useful format
         changedFiles = diff.split('\n')
@@ -142,56 +147,12 @@ export const preCompile = async (app: Probot, context: Context<'pull_request'>)
         stepSixReviewId = review.data.id;
     }
 
-    // Step 7 Copy the changed files to temp
-    try {
-        context.log.info(`Copying changed files to temp storage folder ${tempStorageDirectory}`);
-
-        // Copy the changed files to the temp storage folder
-        for (const file of changedFiles) {
-            if (file.status === 'added' || file.status === 'modified' || file.status === 'renamed' || file.status === 'copied' || file.status === 'type_changed') {
-                console.log(file);
-                const sourcePath = path.join(cloneTargetDirectory, file.filename);
-                console.log(sourcePath);
-                const destinationPath = path.join(tempStorageDirectory, file.filename);
-                console.log(destinationPath);
-
-                // Create the directory structure if it doesn't exist
-                const destinationDir = path.dirname(destinationPath);
-                if (!fs.existsSync(destinationDir)) {
-                    fs.mkdirSync(destinationDir, { recursive: true });
-                }
-
-                fs.copyFileSync(sourcePath, destinationPath);
-            }
-        }
-        
-    } catch (error) {
-        context.log.error(`Error copying changed files to temp storage folder: ${error}`);
-        throw error;
-    }
-    
-    // Step 8: Remove the cloned repo folder
-    try {
-        context.log.info('Removing the cloned repo directory...');
-        deleteFolderRecursiveSync(app, cloneTargetDirectory);
-    } catch (error) {
-        context.log.error(`Error deleting cloned repository: ${error}`);
-        throw error;
-    }
-
-    // Step 9: Move the temp storage folder to the cloned repo folder
-    try {
-        context.log.info('Moving the temp storage folder to the cloned repo folder...');
-        fs.renameSync(tempStorageDirectory, cloneTargetDirectory);
-    } catch (error) {
-        context.log.error(`Error moving temp storage folder: ${error}`);
-        throw error;
-    }
-
-    // Step 10: Compile the content
+    // Step 7: Compile the changed content, the files that link to it and the images it references are validated as well.
+    // The range uses the commits of the PR that are validated in step 4.
+    // The arguments are passed without a shell, so nothing in them is ever executed
     await new Promise<void>((resolve, reject) => {
-        context.log.info(`Compiling content...`);
-        exec('python src/scripts/compileContent.py --skip-link-check', (error: any, stdout: any) => {
+        context.log.info(`Compiling changed content...`);
+        execFile('python', ['src/scripts/compileContent.py', '--changed-files', `${baseSha}...${headSha}`], (error: any, stdout: any) => {
             if (error) {
                 context.log.error(`Execution error: ${error.message}`);
                 reject(error);
@@ -202,7 +163,7 @@ export const preCompile = async (app: Probot, context: Context<'pull_request'>)
         });
     });
 
-    // Step 11: Hide previous bot comments before posting a new one
+    // Step 8: Hide previous bot comments before posting a new one
     try {
         context.log.info('Fetching all reviews on the PR...');
         const reviews = await context.octokit.pulls.listReviews({
@@ -252,7 +213,7 @@ export const preCompile = async (app: Probot, context: Context<'pull_request'>)
         }
     }
 
-    // Step 12: Create a review with the compiled content
+    // Step 9: Create a review with the compiled content
     try {
         // Read the content report file
         const reportPath = path.join(cloneTargetDirectory, 'content_report.md');
@@ -271,7 +232,7 @@ export const preCompile = async (app: Probot, context: Context<'pull_request'>)
         throw error;
     }
 
-    // Step 13: Delete the cloned repository
+    // Step 10: Delete the cloned repository
     try {
         context.log.info('Removing the cloned repository...');
         deleteFolderRecursiveSync(app, clonedRepoFolder);
@@ -280,7 +241,7 @@ export const preCompile = async (app: Probot, context: Context<'pull_request'>)
         throw error;
     }
 
-    // Step 14: Delete the dataset folder
+    // Step 11: Delete the dataset folder
     try {
         context.log.info('Removing the dataset folder...');
         deleteFolderRecursiveSync(app, datasetFolder);
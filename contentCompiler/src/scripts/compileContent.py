@@ -1,15 +1,41 @@
-import os, time, shutil, argparse, logging
-from config import DEST_DIR, SRC_DIR, TAXCO_REPORT_PATH, CONTENT_REPORT_PATH, DATASET
-from files.dataset import parseDatasetFile
-from files.parse import parseMarkdownFiles
-from files.images import fillFailedImages
-from report.populate import populateTaxcoReport, populateContentReport
-from report.generateTaxcoReport import generateTaxcoReport
-from report.generateContentReport import generateContentReport
+import os, time, argparse, logging
+from config import DEST_DIR, SRC_DIR, TAXCO_REPORT_PATH, CONTENT_REPORT_PATH, DATASET_REPORT_PATH, DATASET, MANIFEST_PATH, DATASET_CACHE_DIR, LINK_CACHE_DIR, IMAGE_PUBLISH_MODES
+from context import CompileContext, CompileCache
 
+# The modules of the compile stages are imported when they are used, not when this script starts. The script is started
+# for every event of the GitHub App, so --help, an invalid argument or a changed-files compile of a small pull request
+# doesn't have to wait for modules it doesn't need. See tests/startupBenchmark.py
+
+"""
+Compiles the content of a checkout: parses the dataset and the markdown files, writes the build folder and the reports.
+Every compile gets a new CompileContext, so the same compiler (or compilers of different checkouts) can compile
+more than once in the same process.
+
+Args:
+    root (str): Folder of the checkout, the paths in config.py are relative to this folder.
+    cache (CompileCache): Dataset and indexes shared with other compiles in this process.
+    changedFiles (list): Only validate these files and the files that depend on them, a list of paths relative
+                         to the content repository or a single git diff range (see files/changedFiles.py).
+    resultsPath (str): Stream the results to this NDJSON file while compiling, '-' streams to stdout (see report/resultStream.py).
+"""
 class ContentCompiler:
-    def __init__(self, skipLinkCheck: bool = False):
+    def __init__(self, skipLinkCheck: bool = False, jobs: int = 1, incremental: bool = False, imageMode: str = 'copy', linkCache: bool = False, pipeline: bool = False, root: str = '', cache: CompileCache = None, changedFiles: list = None, resultsPath: str = None):
+        # The manifest of an incremental build can't be updated from a compile of only a part of the files
+        if incremental and changedFiles:
+            raise ValueError("The incremental and changed files modes can't be combined")
+
         self.skipLinkCheck = skipLinkCheck
+        self.jobs = jobs
+        self.incremental = incremental
+        self.imageMode = imageMode
+        self.linkCache = linkCache
+        self.pipeline = pipeline
+        self.root = root
+        self.cache = cache if cache is not None else CompileCache()
+        self.changedFiles = changedFiles
+        self.resultsPath = resultsPath
+        self.context = None
+        self.manifest = None
         self.setupLogging()
 
     @staticmethod
@@ -19,54 +45,130 @@ class ContentCompiler:
             format='%(asctime)s - %(levelname)s - %(message)s'
         )
 
+    # Path of a file or folder in the checkout
+    def path(self, relativePath) -> str:
+        return os.path.join(self.root, relativePath)
+
     def validatePaths(self) -> None:
-        if not os.path.exists(DATASET):
-            raise FileNotFoundError(f"Dataset file {DATASET} not found.")
-        if not os.path.exists(SRC_DIR):
-            raise FileNotFoundError(f"Source directory {SRC_DIR} not found.")
+        if not os.path.exists(self.path(DATASET)):
+            raise FileNotFoundError(f"Dataset file {self.path(DATASET)} not found.")
+        if not os.path.exists(self.path(SRC_DIR)):
+            raise FileNotFoundError(f"Source directory {self.path(SRC_DIR)} not found.")
+
+    # The scope of a changed-files compile, None when all the files are compiled
+    def createScope(self):
+        if not self.changedFiles:
+            return None
+
+        from files.changedFiles import ChangedFileScope, getChangedFiles
+
+        srcDir = os.path.abspath(self.path(SRC_DIR))
+        return ChangedFileScope(srcDir, getChangedFiles(self.changedFiles, os.path.dirname(srcDir)))
 
     def initializeDestDir(self) -> None:
-        if os.path.exists(DEST_DIR):
-            shutil.rmtree(DEST_DIR)
-        os.mkdir(DEST_DIR)
+        destDir = self.path(DEST_DIR)
+        self.manifest = None
+
+        # In incremental mode only the changed files are compiled again
+        if self.incremental:
+            from files.hashing import hashFile
+            from files.manifest import BuildManifest
+
+            self.manifest = BuildManifest(self.path(MANIFEST_PATH), hashFile(self.path(DATASET)), self.skipLinkCheck)
+
+        # The previous build is kept, so the unchanged files aren't written again. The files that aren't
+        # part of this build are removed after the markdown files are parsed
+        os.makedirs(destDir, exist_ok=True)
 
     def compile(self) -> None:
+        from files.dataset import parseDatasetFile
+        from files.parse import parseMarkdownFiles
+        from files.images import fillFailedImages
+        from report.populate import populateTaxcoReport, populateContentReport
+        from report.generateTaxcoReport import generateTaxcoReport
+        from report.generateContentReport import generateContentReport
+        from report.generateDatasetReport import generateDatasetReport
+
+        self.context = context = CompileContext(self.cache)
+        metrics = context.metrics
+        startTime = time.time()
+        status, error = 'failed', None
+
         try:
+            if self.resultsPath:
+                from report.resultStream import ResultStream
+                context.resultStream = ResultStream(self.resultsPath)
+
             self.validatePaths()
             self.initializeDestDir()
+            scope = self.createScope()
             
             logging.info("Starting content compilation...")
             
-            parseDatasetFile(DATASET)
+            with metrics.stage('datasetLoad'):
+                parseDatasetFile(context, self.path(DATASET), self.path(DATASET_CACHE_DIR))
+            if context.resultStream:
+                context.resultStream.writeDatasetRows(context.datasetDiagnostics)
             logging.info("Dataset parsed successfully")
             
-            populateTaxcoReport()
-            populateContentReport()
+            with metrics.stage('reportPopulate'):
+                populateTaxcoReport(context)
+                populateContentReport(context)
             logging.info("Reports populated")
             
-            parseMarkdownFiles(SRC_DIR, DEST_DIR, self.skipLinkCheck)
+            with metrics.stage('parse'):
+                parseMarkdownFiles(context, self.path(SRC_DIR), self.path(DEST_DIR), self.skipLinkCheck, self.jobs, self.manifest, self.imageMode, self.pipeline, scope, self.path(LINK_CACHE_DIR) if self.linkCache else None)
             logging.info("Markdown files parsed")
             
-            fillFailedImages(SRC_DIR, DEST_DIR)
+            with metrics.stage('imageAudit'):
+                fillFailedImages(context, self.path(SRC_DIR), scope)
             logging.info("Failed images processed")
             
-            generateTaxcoReport(TAXCO_REPORT_PATH)
-            generateContentReport(CONTENT_REPORT_PATH)
+            with metrics.stage('reportGeneration'):
+                generateTaxcoReport(context, self.path(TAXCO_REPORT_PATH))
+                generateContentReport(context, self.path(CONTENT_REPORT_PATH))
+                generateDatasetReport(context, self.path(DATASET_REPORT_PATH))
+                if context.resultStream:
+                    context.resultStream.writeCoverage(context.taxcoReport, context.contentReport)
             logging.info("Reports generated successfully")
+
+            if self.manifest:
+                self.manifest.save()
+                logging.info("Build manifest saved")
+
+            status = 'success'
             
         except Exception as e:
+            error = str(e)
             logging.error(f"Error during compilation: {str(e)}", exc_info=True)
             raise
+        finally:
+            # The summary is always the last record, also when the compilation failed
+            if context.resultStream:
+                context.resultStream.writeSummary(context, status, time.time() - startTime, error)
+                context.resultStream.close()
+                logging.info(f"Results written to {self.resultsPath}")
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Compile content script.")
     parser.add_argument('--skip-link-check', required=False, action='store_true', help='Skip link check in markdown files.')
+    parser.add_argument('--incremental', required=False, action='store_true', help='Only compile the files that changed since the previous build.')
+    parser.add_argument('--jobs', required=False, type=int, default=1, help='Amount of processes used to parse the markdown files, 0 uses all cores.')
+    parser.add_argument('--pipeline', required=False, action='store_true', help='Read, parse and write the markdown files at the same time (when --jobs is 1).')
+    parser.add_argument('--image-mode', required=False, choices=IMAGE_PUBLISH_MODES, default='copy', help='Copy, hardlink or clone (copy-on-write) the images into the build folder.')
+    parser.add_argument('--link-cache', required=False, action='store_true', help='Keep the resolved dynamic links between runs.')
+    parser.add_argument('--changed-files', required=False, nargs='+', help='Only validate these files (paths relative to the content repository, or a git diff range) and the files that link to them.')
+    parser.add_argument('--results-out', required=False, help='Stream the results of the files, images, dataset and coverage to this NDJSON file, - writes them to stdout.')
+    parser.add_argument('--metrics-out', required=False, help='Write the timings and counters of the compilation to this JSON file.')
     args = parser.parse_args()
 
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count()
+
     startTime = time.time()
     
+    compiler = None
     try:
-        compiler = ContentCompiler(skipLinkCheck=args.skip_link_check)
+        compiler = ContentCompiler(skipLinkCheck=args.skip_link_check, jobs=jobs, incremental=args.incremental, imageMode=args.image_mode, linkCache=args.link_cache, pipeline=args.pipeline, changedFiles=args.changed_files, resultsPath=args.results_out)
         compiler.compile()
     except Exception as e:
         logging.error(f"Compilation failed: {str(e)}")
@@ -75,5 +177,9 @@ def main() -> None:
         elapsedTime = time.time() - startTime
         logging.info(f"Execution time: {elapsedTime:.2f} seconds")
 
+        if args.metrics_out and compiler and compiler.context:
+            compiler.context.metrics.save(args.metrics_out, elapsedTime)
+            logging.info(f"Metrics written to {args.metrics_out}")
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,137 @@
+import os, json, time, logging, argparse, threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from compileContent import ContentCompiler
+from context import CompileCache
+from config import IMAGE_PUBLISH_MODES
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+"""
+Resident compiler service. Every compile runs in this process, so the parsed dataset, the taxonomy lookup
+and the content and image indexes stay in memory between compiles. Indexes are only rebuilt when the
+content tree changed, the dataset only when the dataset file changed.
+Every compile has its own CompileContext, so compiles of different checkouts run at the same time.
+Compiles of the same checkout wait for each other, they write to the same build folder.
+
+Endpoints:
+    GET  /status   Returns the cached state of the service.
+    POST /compile  Compiles a checkout, the JSON body can contain:
+                   root (str): Folder of the checkout, the same folder the compileContent.py script is started from.
+                   skipLinkCheck, incremental, linkCache, pipeline (bool), jobs (int), imageMode (str): See compileContent.py.
+                   changedFiles (list or str): Changed files or a git diff range, see compileContent.py.
+                   resultsOut (str): Path of the NDJSON result stream, relative to the checkout, see compileContent.py.
+"""
+class CompileRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/status':
+            self.sendJson(404, {'error': f"Unknown path {self.path}"})
+            return
+
+        cache = self.server.cache
+        self.sendJson(200, {
+            'datasetRows': sum(len(rows) for rows, diagnostics in cache.datasets.values()),
+            'contentIndexes': len(cache.contentIndexes),
+            'imageIndexes': len(cache.imageIndexes),
+        })
+
+    def do_POST(self):
+        if self.path != '/compile':
+            self.sendJson(404, {'error': f"Unknown path {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(request, dict):
+                raise ValueError("The body of a compile request must be a JSON object")
+            root = os.path.abspath(request.get('root', self.server.root))
+            compiler = createCompiler(request, root, self.server.cache)
+        except (ValueError, TypeError) as e:
+            self.sendJson(400, {'error': str(e)})
+            return
+
+        startTime = time.time()
+        try:
+            with getCheckoutLock(self.server, root):
+                compiler.compile()
+        except Exception as e:
+            self.sendJson(500, {'status': 'failed', 'error': str(e), 'metrics': getMetrics(compiler, time.time() - startTime)})
+            return
+
+        self.sendJson(200, {'status': 'ok', 'metrics': getMetrics(compiler, time.time() - startTime)})
+
+    def sendJson(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.info(f"{self.address_string()} - {format % args}")
+
+# Create the compiler of a checkout with the options of the request
+def createCompiler(request, root, cache):
+    imageMode = request.get('imageMode', 'copy')
+    if imageMode not in IMAGE_PUBLISH_MODES:
+        raise ValueError(f"Unknown image mode {imageMode}")
+
+    changedFiles = request.get('changedFiles')
+    if isinstance(changedFiles, str):
+        changedFiles = [changedFiles]
+
+    jobs = int(request.get('jobs', 1))
+    return ContentCompiler(
+        skipLinkCheck=bool(request.get('skipLinkCheck', False)),
+        jobs=jobs if jobs > 0 else os.cpu_count(),
+        incremental=bool(request.get('incremental', False)),
+        imageMode=imageMode,
+        linkCache=bool(request.get('linkCache', False)),
+        pipeline=bool(request.get('pipeline', False)),
+        changedFiles=changedFiles,
+        resultsPath=os.path.join(root, request['resultsOut']) if request.get('resultsOut') else None,
+        root=root,
+        cache=cache,
+    )
+
+# Lock of a checkout, so two compiles never write to the same build folder at the same time
+def getCheckoutLock(server, root):
+    with server.lock:
+        if root not in server.checkoutLocks:
+            server.checkoutLocks[root] = threading.Lock()
+        return server.checkoutLocks[root]
+
+# Metrics of the compile, empty when the compile failed before it started
+def getMetrics(compiler, elapsedTime):
+    if compiler.context is None:
+        return {}
+    return compiler.context.metrics.toDict(elapsedTime)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Resident compile server, keeps the dataset and content indexes in memory between compiles.")
+    parser.add_argument('--host', required=False, default=DEFAULT_HOST, help='Address the server listens on.')
+    parser.add_argument('--port', required=False, type=int, default=DEFAULT_PORT, help='Port the server listens on.')
+    parser.add_argument('--root', required=False, default=os.getcwd(), help='Default folder of the checkout to compile.')
+    args = parser.parse_args()
+
+    ContentCompiler.setupLogging()
+
+    server = ThreadingHTTPServer((args.host, args.port), CompileRequestHandler)
+    server.root = os.path.abspath(args.root)
+    server.cache = CompileCache()
+    server.lock = threading.Lock()
+    server.checkoutLocks = {}
+    logging.info(f"Compile server listening on http://{args.host}:{args.port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Compile server stopped")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
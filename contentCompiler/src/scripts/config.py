@@ -1,19 +1,17 @@
-# Global state variables
-dataset = list()												                            # Dataset list 
-parsedFiles = []												                            # Track the status of each parsed file
-failedFiles = []												                            # Track the status of each failed file
-failedImages = []												                            # Track which images don't start with a 4C/ID component
-WIPFiles = []													                            # Track the files that contain Work-in-progress items
-ignoredFiles = []												                            # Track the files that have an ignore tag
-taxcoReport = {}												                            # Report 1 data
-contentReport = {}												                            # Report 2 data
+# The state of a compile is kept in a CompileContext (context.py)
 
 # Constants
 SRC_DIR = "src/cloned_repo/content"								                            # Source directory where the markdown files are located
 DEST_DIR = "src/cloned_repo/build"								                            # Destination directory where the updated markdown files will be saved
 TAXCO_REPORT_PATH = "src/cloned_repo/taxco_report.md"			                            # Taxco report path where the taxco report will be saved
 CONTENT_REPORT_PATH = "src/cloned_repo/content_report.md"		                            # Content report path where the content report will be saved
+DATASET_REPORT_PATH = "src/cloned_repo/dataset_report.md"		                            # Dataset report path where the rows with errors in the dataset are reported
 DATASET = "src/dataset/dataset.xlsx" 							                            # Dataset containing the taxonomie information
+MANIFEST_PATH = "src/cloned_repo/build_manifest.json"			                            # Manifest of the previous build, used by the incremental compile mode
+DATASET_CACHE_DIR = ".cache/dataset"							                            # Folder where the parsed dataset is cached by the hash of the dataset file
+LINK_CACHE_DIR = ".cache/links"									                            # Folder where the resolved dynamic links are cached by the fingerprint of the content files
+LINK_CACHE_SIZE = 100000										                            # Maximum amount of resolved dynamic links kept per content folder
+IMAGE_PUBLISH_MODES = ['copy', 'hardlink', 'reflink']			                            # How the images can be published to the build folder
 TODO_PATTERN = r'-=[A-Z]+=-' 									                            # Regex pattern to find TODO items
 TAXONOMIE_PATTERN = r'^[a-z]{2}-\d{1,3}\.[123]\.[^\s\.]+(-[^\s\.]+)*\.(?:OI|DT|PI|LT)$'     # Taxonomie regex
 VALID_DYNAMIC_LINK_PREFIXES = ['https://', 'http://', 'tags/'] 	                            # List of valid dynamic links
@@ -55,6 +53,11 @@ ERROR_INVALID_DYNAMIC_LINK = "Dynamische link fout: "
 # WIP errors
 ERROR_WIP_FOUND = "Work-in-progress items gevonden: "
 
+# Dataset errors
+ERROR_DATASET_MISSING_VALUE = "Lege waarde in kolom: "
+ERROR_DATASET_INVALID_LEVELS = "Ongeldige niveaus in kolom: "
+ERROR_DATASET_DUPLICATE_TAXCO = "Dubbele TC-1 en onderwerp combinatie, de eerste staat in rij: "
+
 # Icons
 SUCCESS_ICON = "✅"
 FAIL_CIRCLE_ICON = "⛔️"
@@ -0,0 +1,54 @@
+import threading
+from report.rows import ReportRows
+from report.metrics import CompileMetrics
+from report.coverage import CoverageMatrix
+
+
+"""
+Data that can be reused by every compile in the same process, like the compile server does.
+The indexes are stored by the resolved path of their folder, so compiles of different checkouts don't share an index.
+"""
+class CompileCache:
+    def __init__(self):
+        self.datasets = {}                                          # Cleaned rows and errors of the last loaded dataset, by the hash of the dataset file
+        self.contentIndexes = {}                                    # Content file indexes, one per content folder
+        self.imageIndexes = {}                                      # Image indexes, one per source folder
+        self.sourceTrees = {}                                       # Scanned files of a source or content folder, shared by the indexes
+        self.lock = threading.Lock()                                # Used when an index is added or removed
+
+"""
+All the state of a single compile: the dataset, the report data and the report rows.
+Every compile gets its own context, so a process can compile more than once, or compile different checkouts at the same time.
+
+Args:
+    cache (CompileCache): Data shared with other compiles, a new cache is used when it isn't given.
+"""
+class CompileContext:
+    def __init__(self, cache=None):
+        self.cache = cache if cache is not None else CompileCache()
+        self.dataset = []                                           # Dataset list
+        self.datasetDiagnostics = []                                # Rows of the dataset with errors
+        self.taxonomyEntries = []                                   # Parsed dataset rows, in the order of the dataset
+        self.taxonomyLookup = {}                                    # Parsed dataset rows by TC1 and TC3
+        self.parsedFiles = ReportRows('file')                       # Track the status of each parsed file
+        self.failedFiles = ReportRows('file')                       # Track the status of each failed file
+        self.failedImages = ReportRows('image')                     # Track which images don't start with a 4C/ID component
+        self.WIPFiles = ReportRows('file')                          # Track the files that contain Work-in-progress items
+        self.ignoredFiles = ReportRows('file')                      # Track the files that have an ignore tag
+        self.taxcoReport = CoverageMatrix()                         # Report 1 data, coverage by TC1
+        self.contentReport = CoverageMatrix()                       # Report 2 data, coverage by TC3 and TC1
+        self.contentRoots = {}                                      # Content index of every folder with markdown files
+        self.usedImages = set()                                     # Images used by the markdown files
+        self.publishedImages = set()                                # Images published to the build folder
+        self.createdFolders = set()                                 # Folders created in the build folder
+        self.metrics = CompileMetrics()                             # Timings and counters of the compilation
+        self.resultStream = None                                    # NDJSON stream the results are written to, when it's enabled
+
+    # The report lists a parsed file can be added to, by name
+    def getReportList(self, name):
+        return {
+            'parsedFiles': self.parsedFiles,
+            'failedFiles': self.failedFiles,
+            'WIPFiles': self.WIPFiles,
+            'ignoredFiles': self.ignoredFiles,
+        }[name]
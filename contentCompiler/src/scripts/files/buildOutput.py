@@ -0,0 +1,56 @@
+import os, logging
+
+
+"""
+Checks if a file in the build folder already has the given content, so the file doesn't have to be written again.
+A file with another size is changed, otherwise the content of the file is compared. Reading the file is cheaper
+than writing it, and an untouched file keeps its modification time, so the site build and the git commit of the
+build folder only see the files that really changed.
+
+Args:
+    destPath (Path): Path of the file in the build folder.
+    chunks (iterable): The new content of the file in one or more parts (bytes).
+    size (int): Size of the new content.
+"""
+def isUnchangedOutput(destPath, chunks, size):
+    try:
+        if os.stat(destPath).st_size != size:
+            return False
+        with open(destPath, 'rb') as f:
+            return all(f.read(len(chunk)) == chunk for chunk in chunks)
+    except FileNotFoundError:
+        return False
+
+# The paths in the build folder of the markdown files and the used images, the files the build should contain
+def getOutputPaths(filePaths, usedImages, srcDirPath, destDirPath):
+    outputPaths = {destDirPath / filePath.relative_to(srcDirPath) for filePath in filePaths}
+    outputPaths.update(destDirPath / imagePath.relative_to(srcDirPath) for imagePath in usedImages)
+    return outputPaths
+
+"""
+Remove the files of a previous build that aren't part of this build, like the output of a removed markdown file.
+The build folder is kept between compiles so the unchanged files aren't written again, this removes everything else
+(the same files a clean build folder wouldn't contain). Folders that are empty afterwards are removed as well.
+
+Args:
+    destDirPath (Path): Build folder.
+    outputPaths (set): Paths of the files the build should contain.
+
+Returns the amount of removed files.
+"""
+def removeStaleBuildFiles(destDirPath, outputPaths):
+    outputPaths = {str(outputPath) for outputPath in outputPaths}
+    removedFiles = 0
+
+    for folder, subFolders, fileNames in os.walk(destDirPath, topdown=False):
+        for fileName in fileNames:
+            filePath = os.path.join(folder, fileName)
+            if filePath not in outputPaths:
+                os.remove(filePath)
+                removedFiles += 1
+                logging.info(f"Removed stale build output: {filePath}")
+
+        if folder != str(destDirPath) and not os.listdir(folder):
+            os.rmdir(folder)
+
+    return removedFiles
@@ -0,0 +1,118 @@
+import os, logging
+from pathlib import Path
+from files.tokenizer import MarkdownTokens
+from files.links import isExternalLink, rewriteLinkTarget
+from files.contentIndex import splitDynamicLink, hasNameStartingWith
+
+
+"""
+Scope of a changed-files compile, used to validate a pull request without compiling the whole content tree.
+The scope contains the changed markdown files, the markdown files with a dynamic link that could point to a
+changed (or deleted) markdown file and the markdown files that reference a changed image. The images referenced
+by the files in the scope are validated and published when the files are parsed, of the unused images only
+the changed images are reported.
+
+Args:
+    srcDirPath (Path): Source directory where the markdown files are located.
+    changedPaths (list): Paths of the changed files, including the deleted and renamed (old name) files.
+"""
+class ChangedFileScope:
+    def __init__(self, srcDirPath, changedPaths):
+        self.srcDirPath = Path(srcDirPath).resolve()
+        self.changedPaths = {Path(path).resolve() for path in changedPaths}
+        self.changedPaths = {path for path in self.changedPaths if path.is_relative_to(self.srcDirPath)}
+        self.changedNames = sorted(path.name for path in self.changedPaths if path.suffix == '.md')
+        self.changedImages = {path.name for path in self.changedPaths if path.suffix != '.md'}
+
+    # The markdown files in the scope, in the same order as the given files
+    def selectFiles(self, filePaths):
+        selectedFiles = []
+        dependentFiles = 0
+
+        for filePath in filePaths:
+            if filePath.resolve() in self.changedPaths:
+                selectedFiles.append(filePath)
+            elif self.dependsOnChangedFiles(filePath):
+                selectedFiles.append(filePath)
+                dependentFiles += 1
+
+        logging.info(f"Changed files compile: {len(selectedFiles)} of {len(filePaths)} files in scope, {dependentFiles} of them link to a changed file or image")
+        return selectedFiles
+
+    # Checks if a dynamic link of the file could point to a changed markdown file, or the file references a changed image
+    def dependsOnChangedFiles(self, filePath):
+        if not self.changedNames and not self.changedImages:
+            return False
+
+        with open(filePath, 'r', encoding='utf-8') as f:
+            tokens = MarkdownTokens(f.read())
+
+        for link in tokens.links:
+            if isExternalLink(link.target):
+                continue
+            fileName = splitDynamicLink(link.text.replace('content/', ''))[0]
+            if hasNameStartingWith(self.changedNames, fileName):
+                return True
+
+        for image in tokens.images:
+            imagePath = (rewriteLinkTarget(image.path) if image.isDynamicLink else image.path).strip()
+            if imagePath in self.changedImages:
+                return True
+
+        return False
+
+    # Checks if an image is one of the changed files
+    def containsImage(self, imagePath):
+        return Path(imagePath).resolve() in self.changedPaths
+
+"""
+Get the paths of the changed files.
+The changed files are either a list of paths, relative to the content repository (the folder of the
+content folder, like the paths in the output of git diff), or a single git diff range like 'main...feature'.
+A range is computed with git in the content repository, the deleted and the old names of renamed files are included.
+
+Args:
+    changedFiles (list): List of paths or a list with a single git diff range.
+    repoDir (Path): Folder of the content repository.
+"""
+def getChangedFiles(changedFiles, repoDir):
+    repoDir = Path(repoDir)
+
+    if len(changedFiles) == 1 and isGitRange(changedFiles[0], repoDir):
+        changedFiles = getGitDiffFiles(changedFiles[0], repoDir)
+        logging.info(f"{len(changedFiles)} changed files found with git diff")
+
+    return [repoDir / changedFile for changedFile in changedFiles]
+
+# Checks if the changed file is a git diff range instead of a path, like a mistyped path with '..' in it.
+# The range has to be valid in the content repository according to git rev-parse
+def isGitRange(changedFile, repoDir):
+    import subprocess
+
+    if '..' not in changedFile or changedFile.startswith('-') or os.path.exists(repoDir / changedFile):
+        return False
+
+    # With -- git only accepts revisions before it, a path is an error instead of a file to look for
+    result = subprocess.run(['git', '-C', str(repoDir), 'rev-parse', changedFile, '--'], capture_output=True, text=True)
+    if result.returncode != 0:
+        logging.warning(f"{changedFile} is not a git range, it is used as a path: {result.stderr.strip()}")
+        return False
+    return True
+
+# The paths of the files changed in a git diff range, relative to the content repository
+def getGitDiffFiles(gitRange, repoDir):
+    import subprocess
+
+    # A range is never an option of git diff
+    if gitRange.startswith('-'):
+        raise ValueError(f"Invalid git range {gitRange}")
+
+    try:
+        output = subprocess.run(
+            ['git', '-C', str(repoDir), 'diff', '--name-only', '--no-renames', '--relative', '-z', gitRange],
+            check=True, capture_output=True, text=True
+        ).stdout
+    except subprocess.CalledProcessError as e:
+        raise ValueError(f"Changed files of git range {gitRange} can't be found: {e.stderr.strip()}")
+
+    return [changedFile for changedFile in output.split('\0') if changedFile]
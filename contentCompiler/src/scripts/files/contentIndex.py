@@ -0,0 +1,138 @@
+import bisect, logging
+from pathlib import Path
+from config import LINK_CACHE_SIZE
+from files.linkCache import LinkCache, getContentFingerprint
+from files.scanner import getSourceTree, isFolderStateCurrent
+
+
+"""
+Index of all the file names in the content tree.
+The index is built once from the scanned source tree (files/scanner.py), after which every dynamic link can be
+resolved with a binary search instead of walking the whole tree again.
+The resolved links are kept in a bounded LRU cache, the cache belongs to the index,
+so it's thrown away together with the index when the content tree changes.
+
+Args:
+    contentPath (Path): Root of the content tree (the 'content' or 'test_cases' folder).
+    sourceTree (SourceTree): All the files of the content tree.
+"""
+class ContentIndex:
+    def __init__(self, contentPath, sourceTree):
+        self.contentPath = Path(contentPath)
+        self.fileNames = []
+        self.folders = sourceTree.folders
+        self.linkCache = LinkCache(LINK_CACHE_SIZE)
+        self.fingerprint = None
+        self.build(sourceTree)
+
+    # Store the sorted (unique) file names of the content tree
+    def build(self, sourceTree):
+        fileNames = set()
+        for folder, files in sourceTree.files:
+            fileNames.update(files)
+        self.fileNames = sorted(fileNames)
+
+    # Checks if the index still matches the content tree, see SourceTree.isCurrent
+    def isCurrent(self):
+        return isFolderStateCurrent(self.folders)
+
+    # Checks if there is a file in the content tree which name starts with the given prefix.
+    # This keeps the same semantics as the old `file.startswith(fileName)` check.
+    def hasFileStartingWith(self, prefix):
+        return hasNameStartingWith(self.fileNames, prefix)
+
+    # Checks if the target of a dynamic link exists in the content tree, the result is cached by the complete link
+    def containsLink(self, link):
+        return self.linkCache.resolve(link, self.resolveLink)
+
+    def resolveLink(self, link):
+        fileName, anchor = splitDynamicLink(link)
+        return self.hasFileStartingWith(fileName)
+
+    # Fingerprint of the file names, only computed when the link cache is stored between runs
+    def getFingerprint(self):
+        if self.fingerprint is None:
+            self.fingerprint = getContentFingerprint(self.fileNames)
+        return self.fingerprint
+
+"""
+Split a dynamic link in the file name and the anchor (section) part.
+[[folder/file#section|alias]] will return ('file', 'section').
+
+Args:
+    link (str): Dynamic link, with or without the surrounding [[ and ]].
+"""
+def splitDynamicLink(link):
+    cleanedLink = link.strip('[[]]')
+
+    # Remove the alias, which is the part after the '|'
+    cleanedLink = cleanedLink.split('|')[0]
+
+    # If the link contains a section (anchor), split the link at '#'
+    anchor = None
+    if '#' in cleanedLink:
+        cleanedLink, anchor = cleanedLink.split('#', 1)
+
+    fileName = cleanedLink.strip().split('/')[-1]
+    return fileName, anchor
+
+# Binary search in a sorted list of names for a name which starts with the given prefix
+def hasNameStartingWith(sortedNames, prefix):
+    index = bisect.bisect_left(sortedNames, prefix)
+    return index < len(sortedNames) and sortedNames[index].startswith(prefix)
+
+# Get the index for a content folder, the index is only built the first time it is requested.
+def getContentIndex(context, contentPath):
+    contentIndexes = context.cache.contentIndexes
+    key = str(Path(contentPath).resolve())
+    if key not in contentIndexes:
+        contentIndexes[key] = ContentIndex(contentPath, getSourceTree(context, contentPath))
+    return contentIndexes[key]
+
+# Get the index of the content folder a markdown file is located in (the nearest 'content' or 'test_cases' folder).
+# The content folder is looked up once per folder, instead of walking up the parents for every dynamic link.
+def getContentIndexForFile(context, filePath):
+    contentRoots = context.contentRoots
+    folder = Path(filePath).parent
+    if folder not in contentRoots:
+        contentPath = folder
+        while contentPath.name != 'content' and contentPath.name != 'test_cases':
+            contentPath = contentPath.parent
+
+        # Verify that contentPath exists
+        if not contentPath.exists():
+            logging.warning(f"Error: Content path '{contentPath}' does not exist.")
+            contentRoots[folder] = None
+        else:
+            contentRoots[folder] = getContentIndex(context, contentPath)
+
+    return contentRoots[folder]
+
+# Remove the indexes of content trees that changed, the other indexes (and their link caches) are kept for the next compile
+def refreshContentIndexes(context):
+    contentIndexes = context.cache.contentIndexes
+    with context.cache.lock:
+        for key, contentIndex in list(contentIndexes.items()):
+            if not contentIndex.isCurrent():
+                del contentIndexes[key]
+    context.contentRoots.clear()
+
+# Collect the links resolved since the last call, the cache hits and misses are counted in the metrics.
+# Returns the new resolutions by content folder, a worker process sends them to the main process
+def drainLinkCaches(context):
+    newResolutions = {}
+    for key, contentIndex in list(context.cache.contentIndexes.items()):
+        resolutions, hits, misses = contentIndex.linkCache.drain()
+        if hits or misses:
+            context.metrics.count('linkCacheHits', hits)
+            context.metrics.count('linkCacheMisses', misses)
+        if resolutions:
+            newResolutions[key] = resolutions
+    return newResolutions
+
+# Add the links resolved by a worker process to the link caches of this process
+def mergeLinkCaches(context, newResolutions):
+    for key, resolutions in newResolutions.items():
+        contentIndex = context.cache.contentIndexes.get(key)
+        if contentIndex is not None:
+            contentIndex.linkCache.merge(resolutions)
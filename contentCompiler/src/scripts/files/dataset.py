@@ -1,36 +1,226 @@
-import csv, logging
-import pandas as pd
-from config import dataset
-from config import TC1_COL, TC2_COL, TC3_COL, PROCES_COL, PROCESSTAP_COL, LT_COL, OI_COL, PI_COL, DT_COL
-
-
-# Helper function to check if a row is empty
-def checkRowEmpty(row):
-    row_indices = [TC1_COL, TC2_COL, TC3_COL, PROCES_COL, PROCESSTAP_COL, LT_COL, OI_COL, PI_COL, DT_COL]
-    for index in row_indices:
-        if index >= len(row) or row[index] == "" or row[index] is None:
-            return True  
-    return False
-
-# Parse the dataset file from a XLSX file to a list.
-def parseDatasetFile(datasetFile):
-    global dataset
+import os, json, logging
+from itertools import compress
+from config import TC1_COL, TC2_COL, TC3_COL, PROCES_COL, PROCESSTAP_COL, LT_COL, OI_COL, PI_COL, DT_COL, LT, OI, PI, DT, DATASET_CACHE_DIR
+from config import ERROR_DATASET_MISSING_VALUE, ERROR_DATASET_INVALID_LEVELS, ERROR_DATASET_DUPLICATE_TAXCO, FAIL_CROSS_ICON, WARNING_ICON
+from files.hashing import hashFile
+
+DATASET_CACHE_VERSION = 3
+REQUIRED_COLUMNS = [TC1_COL, TC2_COL, TC3_COL, PROCES_COL, PROCESSTAP_COL, LT_COL, OI_COL, PI_COL, DT_COL]
+LEVEL_COLUMNS = [TC2_COL, LT_COL, OI_COL, PI_COL, DT_COL]
+LEVEL_COUNT = 3
+# Folder of the dataset cache when no folder is given, in the scripts folder instead of the working directory
+DEFAULT_DATASET_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), DATASET_CACHE_DIR)
+
+
+"""
+Parse the dataset file from a XLSX file to a list.
+The parsed rows are cached by the hash of the XLSX file, so when the dataset didn't change
+the rows are loaded from the cache without reading the XLSX file. The rows of the last loaded
+dataset are also kept in memory by the compile cache, for a process that compiles more than once (compileServer.py).
+The errors found while cleaning the dataset are cached together with the rows and stored in the context.
+
+Args:
+    context (CompileContext): Context of the compile, the dataset and taxonomie lookup are stored in it.
+    datasetFile (str): Path of the XLSX file.
+    cacheDir (str): Folder of the dataset cache, by default DATASET_CACHE_DIR in the scripts folder.
+"""
+def parseDatasetFile(context, datasetFile, cacheDir=DEFAULT_DATASET_CACHE_DIR):
     try:
-        # Open the dataset and parse it to a list
-        df = pd.read_excel(datasetFile)
-        csvData = df.to_csv(index=False, sep=';')
-        reader = csv.reader(csvData.splitlines(), delimiter=';', quotechar='|')
-        dataset.extend(list(reader))
-        
-        # Remove empty rows, this is done to prevent errors when reading the dataset
-        for row in dataset[1:]:
-            if checkRowEmpty(row): 
-                dataset.remove(row)
-                logging.info(f"Removed empty row: {row}")
-
-    except FileNotFoundError as e:
+        datasetHash = hashFile(datasetFile)
+        cachedDataset = context.cache.datasets.get(datasetHash)
+        if cachedDataset is None:
+            cachedDataset = loadDatasetCache(cacheDir, datasetHash)
+
+        if cachedDataset is not None:
+            dataset, diagnostics = list(cachedDataset[0]), cachedDataset[1]
+            logging.info(f"Dataset loaded from cache: {datasetHash}")
+        else:
+            # Open the dataset and parse it to a list
+            rows, rowNumbers = readDatasetRows(datasetFile)
+
+            # Remove the rows that can't be used, this is done to prevent errors when reading the dataset
+            dataset, diagnostics = cleanDatasetRows(rows, rowNumbers)
+            saveDatasetCache(cacheDir, datasetHash, dataset, diagnostics)
+
+        context.cache.datasets = {datasetHash: (list(dataset), diagnostics)}
+        context.dataset = dataset
+        context.datasetDiagnostics = diagnostics
+        buildTaxonomyLookup(context, dataset[1:])
+
+    except FileNotFoundError:
         logging.error(f"Dataset file {datasetFile} not found")
         raise
     except Exception as e:
         logging.error(f"An error occurred while reading the dataset file: {str(e)}")
         raise
+
+"""
+Validate the dataset and remove the rows that can't be used, in one pass over the table.
+Every check is done on a whole column at once, after which the rows are kept or removed in a single step.
+A row is removed when one of the required columns is empty or a level column doesn't have a value for every level.
+A row is kept, but reported, when a level value isn't 'X' or the number of the level, or when the TC1 and TC3
+combination is already used by an earlier row (the earlier row is used in the taxonomie lookup).
+
+Args:
+    rows (list): Rows of the dataset, including the header row.
+    rowNumbers (list): Row number in the sheet of every row.
+
+Returns the cleaned rows, with the header row, and the errors found in the dataset.
+"""
+def cleanDatasetRows(rows, rowNumbers):
+    if not rows:
+        return [], []
+
+    header, body = rows[0], rows[1:]
+    missingColumns = [index for index in REQUIRED_COLUMNS if index >= len(header)]
+    if missingColumns:
+        raise ValueError(f"Dataset has {len(header)} columns, the columns {missingColumns} are required")
+
+    columns = list(zip(*body)) if body else [()] * len(header)
+
+    # A level column only has a few different values, so every different value is only checked once
+    levelStrings = {value: (len(value.split(',')) != LEVEL_COUNT, not isValidLevelString(value)) for index in LEVEL_COLUMNS for value in set(columns[index])}
+
+    # The errors of every column, True when the value of the row is invalid
+    emptyValues = {index: [not value or value.isspace() for value in columns[index]] for index in REQUIRED_COLUMNS}
+    levelCounts = {index: [levelStrings[value][0] for value in columns[index]] for index in LEVEL_COLUMNS}
+    levelValues = {index: [levelStrings[value][1] for value in columns[index]] for index in LEVEL_COLUMNS}
+
+    removedRows = [any(invalid) for invalid in zip(*emptyValues.values(), *levelCounts.values())]
+    invalidRows = [any(invalid) for invalid in zip(removedRows, *levelValues.values())]
+
+    # Only the first row of a TC1 and TC3 combination is used, the rows that are removed don't count
+    firstRows = {}
+    duplicateRows = {}
+    for position, key in enumerate(zip(columns[TC1_COL], columns[TC3_COL])):
+        if removedRows[position]:
+            continue
+        if key in firstRows:
+            duplicateRows[position] = firstRows[key]
+        else:
+            firstRows[key] = rowNumbers[position + 1]
+
+    diagnostics = []
+    for position in sorted(set(compress(range(len(body)), invalidRows)) | set(duplicateRows)):
+        row = body[position]
+        errors = [ERROR_DATASET_MISSING_VALUE + header[index] for index in REQUIRED_COLUMNS if emptyValues[index][position]]
+        errors += [ERROR_DATASET_INVALID_LEVELS + header[index] for index in LEVEL_COLUMNS if levelValues[index][position] and not emptyValues[index][position]]
+        if position in duplicateRows:
+            errors.append(ERROR_DATASET_DUPLICATE_TAXCO + str(duplicateRows[position]))
+
+        diagnostics.append(createDatasetReportRow(FAIL_CROSS_ICON if removedRows[position] else WARNING_ICON, rowNumbers[position + 1], row, errors))
+        if removedRows[position]:
+            logging.info(f"Removed dataset row {rowNumbers[position + 1]}: {row}")
+
+    return [header] + list(compress(body, [not removed for removed in removedRows])), diagnostics
+
+# Checks if a level column has a value for every level, which is 'X' (not offered) or the number of the level
+def isValidLevelString(value):
+    parts = value.split(',')
+    return len(parts) == LEVEL_COUNT and all(part.strip() in ('X', str(level + 1)) for level, part in enumerate(parts))
+
+# Create a row of the dataset report
+def createDatasetReportRow(status, rowNumber, row, errors):
+    return {
+        "status": status,
+        "row": rowNumber,
+        "tc1": row[TC1_COL] or "N/A",
+        "tc3": row[TC3_COL] or "N/A",
+        "errors": errors,
+    }
+
+# Read the rows of the first sheet of the XLSX file as strings, the sheet is streamed with openpyxl in read-only mode.
+# Returns the rows and the row number in the sheet of every row
+def readDatasetRows(datasetFile):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(datasetFile, read_only=True, data_only=True)
+    try:
+        rows = []
+        rowNumbers = []
+        for rowNumber, values in enumerate(workbook.worksheets[0].iter_rows(values_only=True), start=1):
+            # Skip rows without any value, like the trailing rows of the sheet
+            if all(value is None or value == "" for value in values):
+                continue
+            rows.append([cellToString(value) for value in values])
+            rowNumbers.append(rowNumber)
+    finally:
+        workbook.close()
+
+    # Make every row as long as the header row
+    width = len(rows[0]) if rows else 0
+    return [row + [""] * (width - len(row)) for row in rows], rowNumbers
+
+# Convert the value of a cell to a string, empty cells become an empty string and whole numbers are written without decimals
+def cellToString(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+# Path of the cache file of a dataset with the given hash
+def getDatasetCachePath(cacheDir, datasetHash):
+    return os.path.join(cacheDir, f"{datasetHash}.json")
+
+# Load the cached rows and errors of the dataset, returns None when there is no (valid) cache
+def loadDatasetCache(cacheDir, datasetHash):
+    cachePath = getDatasetCachePath(cacheDir, datasetHash)
+    if not os.path.exists(cachePath):
+        return None
+
+    try:
+        with open(cachePath, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Dataset cache {cachePath} can't be read: {str(e)}")
+        return None
+
+    if cache.get('version') != DATASET_CACHE_VERSION:
+        return None
+
+    return cache['rows'], cache['diagnostics']
+
+# Save the cleaned rows and the errors of the dataset in the cache, a failing cache write doesn't stop the compilation
+def saveDatasetCache(cacheDir, datasetHash, rows, diagnostics):
+    cachePath = getDatasetCachePath(cacheDir, datasetHash)
+    try:
+        os.makedirs(cacheDir, exist_ok=True)
+        with open(cachePath, 'w', encoding='utf-8') as f:
+            json.dump({'version': DATASET_CACHE_VERSION, 'rows': rows, 'diagnostics': diagnostics}, f, ensure_ascii=False)
+    except OSError as e:
+        logging.warning(f"Dataset cache {cachePath} can't be written: {str(e)}")
+
+"""
+Build the taxonomie lookup table from the parsed dataset rows.
+Every row is stored once as an entry with the level columns already split, the entries are
+kept in the order of the dataset and indexed by TC1 and TC3, so a taxonomie code can be
+found with a dictionary lookup instead of scanning the dataset.
+When the same TC1 and TC3 combination is found twice the first row is used in the lookup.
+
+Args:
+    context (CompileContext): Context of the compile, the entries and lookup are stored in it.
+    rows (list): Rows of the dataset without the header row.
+"""
+def buildTaxonomyLookup(context, rows):
+    taxonomyEntries = context.taxonomyEntries = []
+    taxonomyLookup = context.taxonomyLookup = {}
+
+    for row in rows:
+        entry = {
+            'TC1': row[TC1_COL],
+            'TC3': row[TC3_COL],
+            'Proces': row[PROCES_COL],
+            'Processtap': row[PROCESSTAP_COL],
+            'TC2': row[TC2_COL].split(','),
+            LT: row[LT_COL].split(','),
+            OI: row[OI_COL].split(','),
+            PI: row[PI_COL].split(','),
+            DT: row[DT_COL].split(','),
+        }
+        taxonomyEntries.append(entry)
+        taxonomyLookup.setdefault(entry['TC1'], {}).setdefault(entry['TC3'], entry)
+
+# Find the dataset entry of a TC1 and TC3 combination, returns None if it's not in the dataset
+def findTaxonomyEntry(context, tc1, tc3):
+    return context.taxonomyLookup.get(tc1, {}).get(tc3)
@@ -0,0 +1,10 @@
+import hashlib
+
+
+# Calculate the sha256 hash of the content of a file
+def hashFile(filePath):
+    sha256 = hashlib.sha256()
+    with open(filePath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
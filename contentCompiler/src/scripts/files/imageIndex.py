@@ -0,0 +1,73 @@
+import logging
+from pathlib import Path
+from files.scanner import getSourceTree, isFolderStateCurrent, isIgnoredPath
+
+
+"""
+Catalogue of all the files in the source tree which can be referenced as an image.
+The catalogue is built once from the scanned source tree (files/scanner.py) and images are resolved by their file name.
+The compile records every resolved image as used, so the unused images can be reported
+without scanning the build folder again.
+
+Args:
+    srcDir (Path): Source directory where the markdown files and images are located.
+    sourceTree (SourceTree): All the files of the source tree.
+"""
+class ImageIndex:
+    def __init__(self, srcDir, sourceTree):
+        self.srcDir = Path(srcDir)
+        self.images = {}
+        self.duplicates = {}
+        self.folders = sourceTree.folders
+        self.build(sourceTree)
+
+    # The first path found for a file name is used (same order as os.walk)
+    def build(self, sourceTree):
+        for filePath in sourceTree.iterFilePaths():
+            file = filePath.name
+            if file in self.images:
+                self.duplicates.setdefault(file, [self.images[file]]).append(filePath)
+            else:
+                self.images[file] = filePath
+
+        for fileName, filePaths in self.duplicates.items():
+            logging.warning(f"Duplicate image name `{fileName}` found in: {', '.join(str(filePath) for filePath in filePaths)}, using `{filePaths[0]}`")
+
+    # Checks if the index still matches the source tree, see ContentIndex.isCurrent
+    def isCurrent(self):
+        return isFolderStateCurrent(self.folders)
+
+    # Find the path of an image by its file name
+    def resolve(self, imageName):
+        return self.images.get(imageName)
+
+    # Checks if the file is located in a 'src' folder which is not ignored
+    def isSourceImage(self, filePath):
+        relativeFolder = filePath.relative_to(self.srcDir).parent
+        if 'src' not in relativeFolder.parts:
+            return False
+        return not isIgnoredPath(str(relativeFolder))
+
+    # All the images in the 'src' folders which name is not used by any of the markdown files
+    def getUnusedImages(self, usedImages):
+        usedStems = {image.stem for image in usedImages if self.isSourceImage(image)}
+        sourceImages = sorted(filePath for filePath in self.images.values() if self.isSourceImage(filePath))
+        sourceImages += sorted(filePath for filePaths in self.duplicates.values() for filePath in filePaths[1:] if self.isSourceImage(filePath))
+
+        return [image for image in sourceImages if image.stem not in usedStems]
+
+# Get the image index for a source folder, the index is only built the first time it is requested.
+def getImageIndex(context, srcDir):
+    imageIndexes = context.cache.imageIndexes
+    key = str(Path(srcDir).resolve())
+    if key not in imageIndexes:
+        imageIndexes[key] = ImageIndex(Path(srcDir).resolve(), getSourceTree(context, srcDir))
+    return imageIndexes[key]
+
+# Remove the indexes of source trees that changed, the other indexes are kept for the next compile
+def refreshImageIndexes(context):
+    imageIndexes = context.cache.imageIndexes
+    with context.cache.lock:
+        for key, imageIndex in list(imageIndexes.items()):
+            if not imageIndex.isCurrent():
+                del imageIndexes[key]
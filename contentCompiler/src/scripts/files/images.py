@@ -1,31 +1,31 @@
-from pathlib import Path
-import os, re, shutil, logging
-from config import failedImages
-from config import IGNORE_FOLDERS, ERROR_IMAGE_NOT_USED, ERROR_IMAGE_NOT_FOUND, TODO_ITEMS_ICON
+import logging
+from config import ERROR_IMAGE_NOT_USED, ERROR_IMAGE_NOT_FOUND, TODO_ITEMS_ICON
 from report.table import createImageTableTow
+from files.imageIndex import getImageIndex
+from files.publish import publishImage
+from files.links import rewriteLinkTarget
 
 
 """
-Search for image links in the markdown content, and copy the images from the source/
+Copy the images referenced in the markdown content from the source/
 folder to the build/ folder, preserving the folder structure.
 
 Args:
-    content (str): Content of the markdown file.
+    context (CompileContext): Context of the compile, the used images are recorded in it.
+    images (list): Image references found by the tokenizer.
     src_dir_name (str): Source directory (only the name of the folder itself)
     dest_dir_name (str): Destination directory (only the name of the folder itself)
+    imageMode (str): How the images are published to the build folder: 'copy', 'hardlink' or 'reflink'.
+
+Returns the errors and the names of the images referenced in the content.
 """
-def copyImages(content, srcDir, destDir):
+def copyImages(context, images, srcDir, destDir, imageMode='copy'):
     errors = []
-    if content is None:
-        return errors
-    
-    imageLinks = re.findall(r'!\[\[([^\]]+)\]\]|\!\[([^\]]*)\]\(([^)]+)\)', content)
+    imageNames = []
 
-    for imageLink in imageLinks:
-        if imageLink[0]:
-            imagePath = imageLink[0].strip()
-        elif imageLink[2]:
-            imagePath = imageLink[2].strip()
+    for image in images:
+        # An image embed is a dynamic link as well, so it's rewritten like the other dynamic links
+        imagePath = (rewriteLinkTarget(image.path) if image.isDynamicLink else image.path).strip()
 
         if not imagePath:
             continue
@@ -33,51 +33,36 @@ def copyImages(content, srcDir, destDir):
         if imagePath.startswith('http://') or imagePath.startswith('https://'):
             continue
 
-        foundImagePath = None
-        for root, dirs, files in os.walk(srcDir):
-            if imagePath in files:
-                foundImagePath = Path(root) / imagePath
-                break
+        imageNames.append(imagePath)
+        foundImagePath = getImageIndex(context, srcDir).resolve(imagePath)
+        if foundImagePath:
+            context.usedImages.add(foundImagePath)
 
         if foundImagePath and foundImagePath.exists():
             relativePath = foundImagePath.relative_to(srcDir)
-            newImagePath = destDir / relativePath
-            newImagePath.parent.mkdir(parents=True, exist_ok=True)
-            
-            shutil.copy(foundImagePath, newImagePath)
+            publishImage(context, foundImagePath, destDir / relativePath, imageMode)
         else:
             error_msg = f"{ERROR_IMAGE_NOT_FOUND} `{imagePath}`"
             logging.warning(error_msg)
             errors.append(ERROR_IMAGE_NOT_FOUND)
 
-    return errors
+    return errors, imageNames
 
 """
-Fills the image Report with data from the images in the folders
-Every unique TC3 and TC1 combination will be added to the Report 2 data.
+Fills the image Report with the images which are not used in any of the markdown files.
+The used images are recorded by copyImages in the context, so this has to run after parseMarkdownFiles.
+When the scope of a changed-files compile is given, only the changed images are reported.
 """
-def fillFailedImages(srcDir, destDir):
-    srcDirPath = Path(srcDir).resolve()
-    destDirPath = Path(destDir).resolve()
-    
-    srcImages = getImagesInFolder(srcDirPath)
-    destImages = getImagesInFolder(destDirPath)
-
-    for image in srcImages: 
-        if str(image.stem) not in {str(img.stem) for img in destImages}:
-            error_msg = f"{ERROR_IMAGE_NOT_USED} `{image.stem}`"
-            logging.warning(error_msg)
-            failedImages.append(createImageTableTow(TODO_ITEMS_ICON, image, srcDirPath, ERROR_IMAGE_NOT_USED))
+def fillFailedImages(context, srcDir, scope=None):
+    imageIndex = getImageIndex(context, srcDir)
 
-# Helper method to populate the image report
-def getImagesInFolder(dir):
-    folders = [folder for folder in Path(dir).rglob("src") if folder.is_dir()]
-
-    images = set()
-    
-    for folder in folders:
-        if any(ignoreFolder in str(folder) for ignoreFolder in IGNORE_FOLDERS):
+    for image in imageIndex.getUnusedImages(context.usedImages):
+        if scope and not scope.containsImage(image):
             continue
-        
-        images.update(filePath for filePath in folder.rglob("*")) 
-    return images
+
+        error_msg = f"{ERROR_IMAGE_NOT_USED} `{image.stem}`"
+        logging.warning(error_msg)
+        row = createImageTableTow(TODO_ITEMS_ICON, image, imageIndex.srcDir, ERROR_IMAGE_NOT_USED)
+        context.failedImages.append(row)
+        if context.resultStream:
+            context.resultStream.writeImage(row)
@@ -0,0 +1,119 @@
+import os, json, hashlib, logging, threading
+from collections import OrderedDict
+
+LINK_CACHE_VERSION = 2
+
+
+"""
+Bounded LRU cache of the resolved dynamic links of a content index.
+The key is the complete link text, so a hit skips splitting the link as well as the search in the index.
+When the cache is full the least recently used link is removed.
+The index, and so the cache, can be shared by compiles running at the same time, so the cache is locked.
+The hits and misses are counted by the cache itself, a worker process also keeps the links it resolved, so they
+can be sent back to the main process (see drain and merge).
+
+Args:
+    maxSize (int): Maximum amount of links in the cache.
+"""
+class LinkCache:
+    def __init__(self, maxSize):
+        self.maxSize = maxSize
+        self.resolutions = OrderedDict()
+        self.lock = threading.Lock()
+        self.collectNew = False                                     # Keep the new resolutions until they are drained, used in a worker process
+        self.reset()
+
+    def reset(self):
+        self.newResolutions = {}
+        self.hits = 0
+        self.misses = 0
+
+    # Get the result of a link from the cache, a link that isn't cached is resolved with the given function
+    def resolve(self, link, resolver):
+        with self.lock:
+            found = self.resolutions.get(link)
+            if found is not None:
+                self.resolutions.move_to_end(link)
+                self.hits += 1
+                return found
+
+            self.misses += 1
+            found = resolver(link)
+            self.put(link, found)
+            if self.collectNew:
+                self.newResolutions[link] = found
+            return found
+
+    # Add a result, the lock has to be held
+    def put(self, link, found):
+        self.resolutions[link] = found
+        self.resolutions.move_to_end(link)
+        if len(self.resolutions) > self.maxSize:
+            self.resolutions.popitem(last=False)
+
+    # Add the results of another cache, like the cache of a previous run or a worker process
+    def merge(self, resolutions):
+        with self.lock:
+            for link, found in resolutions.items():
+                self.put(link, found)
+
+    # Return the new resolutions, hits and misses since the last drain and start counting again
+    def drain(self):
+        with self.lock:
+            data = (self.newResolutions, self.hits, self.misses)
+            self.reset()
+            return data
+
+    # A copy of the cached results, from the least to the most recently used link
+    def items(self):
+        with self.lock:
+            return dict(self.resolutions)
+
+    # The lock can't be sent to a worker process, the worker gets its own lock
+    def __getstate__(self):
+        return {'maxSize': self.maxSize, 'resolutions': self.items()}
+
+    def __setstate__(self, state):
+        self.__init__(state['maxSize'])
+        self.resolutions.update(state['resolutions'])
+
+    def __len__(self):
+        return len(self.resolutions)
+
+# Fingerprint of the file names in a content index, the cached resolutions are only valid for the same file names
+def getContentFingerprint(fileNames):
+    sha256 = hashlib.sha256()
+    for fileName in fileNames:
+        sha256.update(fileName.encode('utf-8', 'surrogateescape') + b'\0')
+    return sha256.hexdigest()
+
+# Path of the cache file of a content index with the given fingerprint
+def getLinkCachePath(cacheDir, fingerprint):
+    return os.path.join(cacheDir, f"{fingerprint}.json")
+
+# Fill the link cache of a content index with the resolutions of a previous run with the same content files
+def loadLinkCache(contentIndex, cacheDir):
+    cachePath = getLinkCachePath(cacheDir, contentIndex.getFingerprint())
+    if not os.path.exists(cachePath):
+        return
+
+    try:
+        with open(cachePath, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Link cache {cachePath} can't be read: {str(e)}")
+        return
+
+    if cache.get('version') == LINK_CACHE_VERSION:
+        contentIndex.linkCache.merge(cache['resolutions'])
+        logging.info(f"Link cache loaded: {len(cache['resolutions'])} links")
+
+# Save the link cache of a content index, a failing cache write doesn't stop the compilation
+def saveLinkCache(contentIndex, cacheDir):
+    cachePath = getLinkCachePath(cacheDir, contentIndex.getFingerprint())
+    try:
+        os.makedirs(cacheDir, exist_ok=True)
+        with open(cachePath, 'w', encoding='utf-8') as f:
+            json.dump({'version': LINK_CACHE_VERSION, 'resolutions': contentIndex.linkCache.items()}, f, ensure_ascii=False)
+    except OSError as e:
+        logging.warning(f"Link cache {cachePath} can't be written: {str(e)}")
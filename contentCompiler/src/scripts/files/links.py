@@ -1,74 +1,98 @@
-import re, os, logging
-from pathlib import Path
+import logging
 from config import VALID_DYNAMIC_LINK_PREFIXES, ERROR_INVALID_DYNAMIC_LINK
+from files.contentIndex import getContentIndexForFile, splitDynamicLink
 
 
-# Update dynamic links in the content of a markdown file.
-def updateDynamicLinks(filePath, content, skipValidateDynamicLinks):
-    # Find all dynamic links in the content
-    dynamicLinks = re.findall(r'\[\[[^"\[][^]]*?\]\]', content)
+# Update dynamic links in the content of a markdown file, the links are found by the tokenizer.
+# The updated content is built in a single pass, and every unique link is only validated once per file.
+# Returns the updated content, the errors and the file names the dynamic links point to.
+def updateDynamicLinks(context, filePath, content, dynamicLinks, skipValidateDynamicLinks):
+    newLinks, errors, linkTargets = resolveDynamicLinks(context, filePath, dynamicLinks, skipValidateDynamicLinks)
+    return replaceDynamicLinks(content, dynamicLinks, newLinks), errors, linkTargets
 
+# Rewrite and validate the dynamic links of a file, without changing the content itself.
+# Returns the new text of every link (None for a link that isn't rewritten), the errors and the file names the links point to.
+def resolveDynamicLinks(context, filePath, dynamicLinks, skipValidateDynamicLinks):
     errors = []
+    linkTargets = []
+    validLinks = {}
+    newLinks = []
+    contentIndex = None
+    isContentIndexFound = False
     
-    for link in dynamicLinks:
-        cleanedLink = link.strip('[[]]')
+    for dynamicLink in dynamicLinks:
+        link = dynamicLink.text
         
         # Skip links that start with any of the valid prefixes
-        if any(cleanedLink.startswith(prefix) for prefix in VALID_DYNAMIC_LINK_PREFIXES):
+        if isExternalLink(dynamicLink.target):
+            newLinks.append(None)
             continue
         
         # Remove 'content/' because in production the content is not in the 'content' folder but in the root of the build folder
         newLink = link.replace('content/', '')
-        
-        # Replace the old link with the new link in the content
-        content = content.replace(link, newLink)
+        newLinks.append(newLink)
+        linkTargets.append(splitDynamicLink(newLink)[0])
         
         # Skip dynamic link check if flag is set
         # This is used in the PR validation check when only updated the content is being checked
         if(skipValidateDynamicLinks):
             continue
 
-        # Check if the dynamic link is valid
-        if not validateDynamicLink(filePath, newLink):
+        # Check if the dynamic link is valid, a link used more than once in the file is reported for every use
+        if newLink not in validLinks:
+            context.metrics.count('linksChecked')
+            # The content folder and its index are looked up once per file
+            if not isContentIndexFound:
+                contentIndex = getContentIndexForFile(context, filePath)
+                isContentIndexFound = True
+            validLinks[newLink] = validateDynamicLink(contentIndex, filePath, newLink)
+
+        if not validLinks[newLink]:
             reportLink = newLink.replace('|', '\|')
             errors.append(f"{ERROR_INVALID_DYNAMIC_LINK} `{reportLink}`")
             logging.warning(f"{ERROR_INVALID_DYNAMIC_LINK} `{newLink}` in bestand: {filePath}")
 
-    return content, errors
+    return newLinks, errors, linkTargets
 
-# Checks if the dynamic link is valid and the file exists.
-def validateDynamicLink(sourceFilePath, link):
-    # Define the root content directory (assuming it is one level up from the current script)
-    contentPath = sourceFilePath
-    while Path(contentPath).name != 'content' and Path(contentPath).name != 'test_cases':
-        contentPath = contentPath.parent
-    
-    # Verify that contentPath exists
-    if not contentPath.exists():
-        logging.warning(f"Error: Content path '{contentPath}' does not exist.")
-        return False
+# Replace the dynamic links in the content by their new text, the content is copied once
+def replaceDynamicLinks(content, dynamicLinks, newLinks):
+    parts = []
+    position = 0
+
+    for dynamicLink, newLink in zip(dynamicLinks, newLinks):
+        if newLink is None:
+            continue
+
+        # Copy the content up to the link and the new link, the rest of the content is added after the loop
+        parts.append(content[position:dynamicLink.start])
+        parts.append(newLink)
+        position = dynamicLink.end
+
+    if not parts:
+        return content
 
-    # Clean up the link by removing the surrounding [[ and ]]
-    cleanedLink = link.strip('[[]]')
+    parts.append(content[position:])
+    return ''.join(parts)
 
-    # If the link contains a section (anchor), split the link at '#'
-    if '#' in cleanedLink:
-        cleanedLink = cleanedLink.split('#')[0]  # Use only the part before '#'
+# Checks if the target of a dynamic link starts with any of the valid prefixes, these links are not rewritten or validated
+def isExternalLink(target):
+    return any(target.startswith(prefix) for prefix in VALID_DYNAMIC_LINK_PREFIXES)
 
-    # Parse the base name from the cleaned link
-    linkParts = cleanedLink.split('|')
-    fileName = linkParts[0].strip().split('/')[-1]
+# The target of a dynamic link like it's written to the build folder
+def rewriteLinkTarget(target):
+    return target if isExternalLink(target) else target.replace('content/', '')
+
+# Checks if the dynamic link is valid and the file exists in the index of the content folder of the file.
+def validateDynamicLink(contentIndex, sourceFilePath, link):
+    if contentIndex is None:
+        return False
 
-    # Search for the file in all subdirectories within 'content' using os.walk
-    foundFile = None
-    for root, dirs, files in os.walk(contentPath):
-        for file in files:
-            if file.startswith(fileName):
-                # If the file is found, the link is valid, so break the loop
-                return True
+    # Search for the file in the index of the content folder, the results are cached by the index
+    if contentIndex.containsLink(link):
+        return True
 
     # If no valid file is found, report error with details
-    if not foundFile:
-        logging.warning(f"Error: source file: {sourceFilePath}, target file '{fileName}' not found in content.")
+    fileName, anchor = splitDynamicLink(link)
+    logging.warning(f"Error: source file: {sourceFilePath}, target file '{fileName}' not found in content.")
 
     return False
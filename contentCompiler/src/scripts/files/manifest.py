@@ -0,0 +1,133 @@
+import os, json, logging
+from pathlib import Path
+from files.hashing import hashFile
+from files.contentIndex import hasNameStartingWith
+
+MANIFEST_VERSION = 2
+
+
+"""
+Manifest of the previous build, used by the incremental compile mode.
+For every markdown file the manifest stores the content hash, the outgoing dynamic links,
+the referenced images and the result of parsing the file (report row and found taxonomies).
+Unchanged files are not parsed again, their stored result is used to regenerate the reports.
+
+Args:
+    manifestPath (Path): Path of the manifest file, next to the build folder.
+    datasetHash (str): Hash of the dataset file, when the dataset changes every file is parsed again.
+    skipLinkCheck (bool): When the link check option changes every file is parsed again.
+"""
+class BuildManifest:
+    def __init__(self, manifestPath, datasetHash, skipLinkCheck):
+        self.manifestPath = Path(manifestPath)
+        self.datasetHash = datasetHash
+        self.skipLinkCheck = skipLinkCheck
+        self.previous = self.load()
+        self.files = {}
+        self.contentFiles = []
+        self.images = {}
+        self.usedImages = []
+
+    # Load the previous manifest, an empty manifest is returned when it can't be used for this build
+    def load(self):
+        empty = {'files': {}, 'contentFiles': [], 'images': {}, 'usedImages': []}
+
+        if not self.manifestPath.exists():
+            return empty
+
+        try:
+            with open(self.manifestPath, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Build manifest {self.manifestPath} can't be read, compiling all files: {str(e)}")
+            return empty
+
+        if manifest.get('version') != MANIFEST_VERSION or manifest.get('datasetHash') != self.datasetHash or manifest.get('skipLinkCheck') != self.skipLinkCheck:
+            logging.info("Dataset or build options changed, compiling all files")
+            return empty
+
+        return manifest
+
+    # Checks if there is a previous build the manifest can be used for
+    def hasPreviousBuild(self):
+        return bool(self.previous['files'])
+
+    """
+    Find the markdown files that have to be parsed again.
+    A file is parsed again when it's new or changed, when its build output is missing,
+    when a file is added or removed that one of its dynamic links could point to,
+    or when one of the images it references is added, removed or changed.
+    """
+    def findChangedFiles(self, filePaths, srcDirPath, destDirPath, contentIndex, imageIndex):
+        self.contentFiles = contentIndex.fileNames
+        self.images = self.getImageState(imageIndex, srcDirPath)
+
+        changedNames = sorted(set(self.contentFiles).symmetric_difference(self.previous['contentFiles']))
+        changedImages = {name for name in set(self.images) | set(self.previous['images']) if self.images.get(name) != self.previous['images'].get(name)}
+
+        changedFiles = []
+        for filePath in filePaths:
+            relativePath = str(filePath.relative_to(srcDirPath))
+            fileHash = hashFile(filePath)
+            entry = self.previous['files'].get(relativePath)
+            self.files[relativePath] = {'hash': fileHash}
+
+            if entry is None or entry['hash'] != fileHash or not (destDirPath / relativePath).exists():
+                changedFiles.append(filePath)
+            elif any(hasNameStartingWith(changedNames, target) for target in entry['links']):
+                changedFiles.append(filePath)
+            elif any(image in changedImages for image in entry['images']):
+                changedFiles.append(filePath)
+            else:
+                self.files[relativePath] = entry
+
+        return changedFiles
+
+    # The path, size and modification time of every image name in the image index
+    def getImageState(self, imageIndex, srcDirPath):
+        images = {}
+        for name, imagePath in imageIndex.images.items():
+            stat = imagePath.stat()
+            images[name] = [str(imagePath.relative_to(srcDirPath)), stat.st_size, stat.st_mtime_ns]
+        return images
+
+    # Store the result of a parsed file
+    def updateFile(self, filePath, srcDirPath, result):
+        entry = self.files[str(filePath.relative_to(srcDirPath))]
+        entry['links'] = sorted(set(result['linkTargets']))
+        entry['images'] = sorted(set(result['images']))
+        entry['result'] = result
+
+    # Get the stored result of an unchanged file
+    def getResult(self, filePath, srcDirPath):
+        return self.files[str(filePath.relative_to(srcDirPath))]['result']
+
+    # Remove the build output of markdown files and images that are no longer part of the build
+    def removeStaleOutput(self, destDirPath, usedImages, srcDirPath):
+        currentImages = {str(image.relative_to(srcDirPath)) for image in usedImages}
+        staleFiles = set(self.previous['files']) - set(self.files)
+        staleFiles |= set(self.previous['usedImages']) - currentImages
+
+        for relativePath in sorted(staleFiles):
+            stalePath = destDirPath / relativePath
+            if stalePath.exists():
+                os.remove(stalePath)
+                logging.info(f"Removed stale build output: {stalePath}")
+
+        self.usedImages = sorted(currentImages)
+
+    # Write the manifest to disk
+    def save(self):
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'datasetHash': self.datasetHash,
+            'skipLinkCheck': self.skipLinkCheck,
+            'contentFiles': self.contentFiles,
+            'images': self.images,
+            'usedImages': self.usedImages,
+            'files': self.files,
+        }
+
+        self.manifestPath.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.manifestPath, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
@@ -0,0 +1,118 @@
+import mmap, codecs
+from files.tokenizer import MarkdownTokens
+from files.links import replaceDynamicLinks
+
+MAPPED_FILE_SIZE = 1024 * 1024                                  # Markdown files of at least this size are memory-mapped instead of read
+MAPPED_CHUNK_SIZE = 1024 * 1024                                 # Size of the parts in which the body of a mapped file is validated and written
+
+
+"""
+A large markdown file (like a file with a long code listing or base64 data), memory-mapped instead of read into a string.
+Only the header is decoded: the content up to and including the second '---', the same split as FrontMatter.
+The body stays in the mapped buffer, it's tokenized as bytes and written to the build folder in slices of the buffer,
+with the rewritten dynamic links in between. So the memory use and the copies of a file scale with its header, not
+with the size of the file. Use mapMarkdownFile to open a file, it returns None for files that can't use this path.
+
+Args:
+    buffer (mmap): The mapped file.
+    bodyStart (int): Position of the body in the buffer, right after the second '---'.
+"""
+class MappedMarkdownFile:
+    def __init__(self, buffer, bodyStart):
+        self.buffer = buffer
+        self.bodyStart = bodyStart
+        self.header = buffer[:bodyStart].decode('utf-8')
+        self.headerLinks = 0                                        # Amount of links found in the header
+        self.bodyReplacements = []                                  # Position and new text of the rewritten links of the body
+
+    # The tokens of the header and the body, in the same order as a scan over the whole content
+    def tokenize(self):
+        tokens = MarkdownTokens(self.header)
+        bodyTokens = MarkdownTokens(buffer=self.buffer, start=self.bodyStart)
+        self.headerLinks = len(tokens.links)
+
+        tokens.links += bodyTokens.links
+        tokens.images += bodyTokens.images
+        tokens.wipItems += bodyTokens.wipItems
+        return tokens
+
+    """
+    Replace the dynamic links (the links of tokenize, with their new text from resolveDynamicLinks).
+    The links of the header are replaced in the header, the links of the body are replaced while the body is written.
+    Returns the new header.
+    """
+    def replaceDynamicLinks(self, dynamicLinks, newLinks):
+        self.bodyReplacements = [
+            (dynamicLink.start, dynamicLink.end, newLink.encode('utf-8'))
+            for dynamicLink, newLink in zip(dynamicLinks[self.headerLinks:], newLinks[self.headerLinks:])
+            if newLink is not None
+        ]
+        return replaceDynamicLinks(self.header, dynamicLinks[:self.headerLinks], newLinks[:self.headerLinks])
+
+    # The parsed file, the new header followed by the body
+    def createOutput(self, header):
+        return MappedOutput(header.encode('utf-8'), self)
+
+    def close(self):
+        self.buffer.close()
+
+"""
+Content of a parsed mapped file: the new header followed by the body of the mapped file, with the rewritten links.
+The content is never built as a whole, chunks returns it in parts of at most MAPPED_CHUNK_SIZE bytes.
+"""
+class MappedOutput:
+    def __init__(self, header, mappedFile):
+        self.header = header
+        self.mappedFile = mappedFile
+        self.size = len(header) + len(mappedFile.buffer) - mappedFile.bodyStart
+        self.size += sum(len(newLink) - (end - start) for start, end, newLink in mappedFile.bodyReplacements)
+
+    def chunks(self):
+        buffer = self.mappedFile.buffer
+        position = self.mappedFile.bodyStart
+
+        yield self.header
+        for start, end, newLink in self.mappedFile.bodyReplacements:
+            yield from sliceBuffer(buffer, position, start)
+            yield newLink
+            position = end
+        yield from sliceBuffer(buffer, position, len(buffer))
+
+    def close(self):
+        self.mappedFile.close()
+
+"""
+Map a markdown file which is opened in text mode, or return None when the file has to be read as a string:
+a file without a header (less than two '---') or a file with carriage returns, which reading in text mode translates.
+The file is checked to be valid UTF-8, like reading it as a string would.
+
+Args:
+    f (file): The opened markdown file.
+"""
+def mapMarkdownFile(f):
+    buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    headerStart = buffer.find(b'---')
+    bodyStart = buffer.find(b'---', headerStart + 3) if headerStart != -1 else -1
+    if bodyStart == -1 or buffer.find(b'\r') != -1:
+        buffer.close()
+        return None
+
+    try:
+        validateUtf8(buffer)
+        return MappedMarkdownFile(buffer, bodyStart + 3)
+    except UnicodeDecodeError:
+        buffer.close()
+        raise
+
+# Decode the buffer in chunks and throw the text away, raises a UnicodeDecodeError when the buffer isn't valid UTF-8
+def validateUtf8(buffer):
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for chunk in sliceBuffer(buffer, 0, len(buffer)):
+        decoder.decode(chunk)
+    decoder.decode(b'', final=True)
+
+# Copy a part of the buffer in chunks of at most MAPPED_CHUNK_SIZE bytes
+def sliceBuffer(buffer, start, end):
+    for position in range(start, end, MAPPED_CHUNK_SIZE):
+        yield buffer[position:min(position + MAPPED_CHUNK_SIZE, end)]
@@ -1,26 +1,32 @@
-import re, logging
-from config import dataset, contentReport
-from config import PROCES_COL, PROCESSTAP_COL, TC3_COL, TC2_COL, TAXONOMIE_PATTERN, TODO_PATTERN, ERROR_INVALID_TAXCO, ERROR_NO_TAXCO_FOUND, ERROR_TAXCO_NOT_FOUND, ERROR_TAXCO_NOT_NEEDED
-from report.generateTaxcoReport import updateProcessReportData, updateSubjectReportData
+import logging
+from config import ERROR_INVALID_TAXCO, ERROR_NO_TAXCO_FOUND, ERROR_TAXCO_NOT_FOUND, ERROR_TAXCO_NOT_NEEDED
+from files.dataset import findTaxonomyEntry
+from files.tokenizer import TAXONOMIE_REGEX
 
 
 """
 Generate tags based on the taxonomie values
 Args:
+    context (CompileContext): Context of the compile, with the dataset and the content report.
     taxonomies (list): List of taxonomie values.
     existingTags (list): List of existing tags.
     filePath (str): Path to the markdown file being processed.
+
+Returns the tags, the errors and the taxonomies found in the dataset as (tc1, tc2, tc3, tc4) tuples.
+The found taxonomies are used to update the report data, this is done by the caller so the
+files can also be processed in a separate process.
 """
-def generateTags(taxonomies, existingTags, filePath):
+def generateTags(context, taxonomies, existingTags, filePath):
     tags = []
     errors = []
     combinedTags = []
     taxonomieTags = []
+    foundTaxonomies = []
 
     if taxonomies is not None and taxonomies != ['None'] and taxonomies != [''] and taxonomies != []:
         for taxonomie in taxonomies:
             # Check if the taxonomie is in the correct format
-            if not re.match(TAXONOMIE_PATTERN, taxonomie):
+            if not TAXONOMIE_REGEX.match(taxonomie):
                 errors.append(f"{ERROR_INVALID_TAXCO} `{taxonomie}`")
                 logging.warning(f"{ERROR_INVALID_TAXCO} `{taxonomie}` in bestand: {filePath}")
                 continue
@@ -29,42 +35,33 @@ def generateTags(taxonomies, existingTags, filePath):
             tc1, tc2, tc3, tc4 = splitTaxonomie(taxonomie)
             # if the parts are all valid
             if tc1 and tc2 and tc3 and tc4:
-                # Loop trough every row in the dataset
-                for row in dataset[1:]:
-                    # Check if the first part of the taxonomie is equal to the second column (TC1) in the dataset
-                    if row[1] == tc1:
-                        # Check if the second part of the taxonomie is equal to the third column (TC2) in the dataset
-                        if row[5] in contentReport and row[5] == tc3:
-                            # Adds the taxonomie
-                            newTag = "HBO-i/niveau-" + tc2
-                            if newTag not in tags:
-                                tags.append(newTag)
-    
-                            # Adds the proces
-                            if row[PROCES_COL] not in tags:
-                                tags.append(row[PROCES_COL])
-
-                            # Adds the processtap
-                            if row[PROCESSTAP_COL] not in tags:
-                                tags.append(row[PROCESSTAP_COL])
-
-                            # Check if the third part of the taxonomie is in the lookup table
-                            if row[TC3_COL] not in tags:
-                                tags.append(row[TC3_COL])
-
-                            # Check if the taxonomie is not needed
-                            splittedRow =  row[TC2_COL].split(',')
-                            if splittedRow[int(tc2)-1] == "X": 
-                                errors.append(f"{ERROR_TAXCO_NOT_NEEDED} `{taxonomie}`")
-                                logging.warning(f"{ERROR_TAXCO_NOT_NEEDED} `{taxonomie}` in bestand: {filePath}")
-
-                            # Update the process report data with the new values
-                            # This is needed so the report has the correct data
-                            # Before the script runs it pre-fills the report with all the taxonomies
-                            # This is done so the report has all the taxonomies even if they are not used
-                            # After this the report is updated with the correct data
-                            updateProcessReportData(tc1, tc2)
-                            updateSubjectReportData(tc1, tc2, tc3, tc4)
+                # Find the row of the first (TC1) and third (TC3) part of the taxonomie in the dataset
+                entry = findTaxonomyEntry(context, tc1, tc3)
+                if entry and context.contentReport.hasGroup(tc3):
+                    # Adds the taxonomie
+                    newTag = "HBO-i/niveau-" + tc2
+                    if newTag not in tags:
+                        tags.append(newTag)
+
+                    # Adds the proces
+                    if entry['Proces'] not in tags:
+                        tags.append(entry['Proces'])
+
+                    # Adds the processtap
+                    if entry['Processtap'] not in tags:
+                        tags.append(entry['Processtap'])
+
+                    # Adds the onderwerp (TC3)
+                    if entry['TC3'] not in tags:
+                        tags.append(entry['TC3'])
+
+                    # Check if the taxonomie is not needed
+                    if entry['TC2'][int(tc2)-1] == "X": 
+                        errors.append(f"{ERROR_TAXCO_NOT_NEEDED} `{taxonomie}`")
+                        logging.warning(f"{ERROR_TAXCO_NOT_NEEDED} `{taxonomie}` in bestand: {filePath}")
+
+                    # Keep track of the found taxonomie, so the report data can be updated
+                    foundTaxonomies.append((tc1, tc2, tc3, tc4))
 
             # If no tags were found, add an error
             if tags == [] and not errors:
@@ -82,40 +79,63 @@ def generateTags(taxonomies, existingTags, filePath):
     # Sort combined_tags so that "HBO-i/niveau-" tags are moved to the start
     combinedTags = sorted(combinedTags, key=lambda tag: (not tag.startswith("HBO-i/niveau-"), tag))
 
-    return list(dict.fromkeys(combinedTags)), errors
+    return list(dict.fromkeys(combinedTags)), errors, foundTaxonomies
 
 def splitTaxonomie(taxonomie):
     return taxonomie.split('.')
 
-# Helper function to extract specific values from the content of a markdown file.
-def extractHeaderValues(content, fieldName):
-    lines = content.splitlines()
-    values = []
-
-    for i, line in enumerate(lines):
-        if line.startswith(f'{fieldName}:'):
-            # Handle case where the field has a single value
-            if ':' in line and len(line.split(':', 1)[1].strip()) > 0:
-                values.append(line.split(':', 1)[1].strip())
-            else:
-                # Handle case where the field is a list
-                for j in range(i + 1, len(lines)):
-                    subLine = lines[j].strip()
-                    if subLine.startswith('- '):
-                        values.append(subLine.lstrip('- ').strip())
-                    else:
-                        break
-            break
-
-    return values if values else None
-
-# Helper function to find all the To-Do items in the content of a markdown file.	
-def findWIPItems(content):
-    return re.findall(TODO_PATTERN, content)
+"""
+Front matter (header) of a markdown file, the part between the first two '---' lines.
+The header is parsed once into scalar and list fields, the body is the content after the header.
+
+Args:
+    content (str): Content of the markdown file.
+"""
+class FrontMatter:
+    def __init__(self, content):
+        parts = content.split('---', 2)
+        self.body = parts[-1]
+        self.fields = parseHeaderFields(parts[1] if len(parts) == 3 else '')
+
+    # Get the values of a field, a single value is returned as a list with one value
+    def get(self, fieldName):
+        values = self.fields.get(fieldName)
+        return values if values else None
+
+# Helper function to parse all the fields of a header in one pass, only the first occurrence of a field is used.
+def parseHeaderFields(header):
+    fields = {}
+    listField = None
+
+    for line in header.splitlines():
+        # Handle case where the field is a list
+        if listField is not None:
+            subLine = line.strip()
+            if subLine.startswith('- '):
+                fields[listField].append(subLine.lstrip('- ').strip())
+                continue
+            listField = None
+
+        if ':' not in line:
+            continue
+
+        fieldName, value = line.split(':', 1)
+        if fieldName in fields:
+            continue
+
+        # Handle case where the field has a single value
+        value = value.strip()
+        if value:
+            fields[fieldName] = [value]
+        else:
+            fields[fieldName] = []
+            listField = fieldName
+
+    return fields
 
 # Helper function to check if a file has an ignore tag.
-def hasIgnoreTag(content, filePath):
-    ignoreTAG = extractHeaderValues(content, 'ignore')
+def hasIgnoreTag(frontMatter, filePath):
+    ignoreTAG = frontMatter.get('ignore')
         
     if ignoreTAG:        
         if "true" in ignoreTAG:
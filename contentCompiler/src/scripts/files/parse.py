@@ -1,53 +1,215 @@
-import logging
+import os, logging
 from pathlib import Path
-from config import failedFiles, parsedFiles, WIPFiles, ignoredFiles
-from config import ERROR_NO_TAXCO_FOUND, FAIL_CROSS_ICON, WARNING_ICON, SUCCESS_ICON, TODO_ITEMS_ICON, IGNORE_FOLDERS, ERROR_WIP_FOUND, ERROR_TAXCO_NOT_NEEDED, NOT_NEEDED_ICON, ERROR_IGNORE_TAG_USED
+from functools import partial
+from config import ERROR_NO_TAXCO_FOUND, FAIL_CROSS_ICON, WARNING_ICON, SUCCESS_ICON, TODO_ITEMS_ICON, ERROR_WIP_FOUND, ERROR_TAXCO_NOT_NEEDED, NOT_NEEDED_ICON, ERROR_IGNORE_TAG_USED
 from files.images import copyImages
-from files.links import updateDynamicLinks
+from files.links import updateDynamicLinks, resolveDynamicLinks
+from files.mappedFile import MappedMarkdownFile, MappedOutput, mapMarkdownFile, MAPPED_FILE_SIZE
+from files.contentIndex import getContentIndex, refreshContentIndexes, drainLinkCaches, mergeLinkCaches
+from files.linkCache import loadLinkCache, saveLinkCache
+from files.pipeline import runPipeline
+from files.imageIndex import getImageIndex, refreshImageIndexes
+from files.scanner import getSourceTree, refreshSourceTrees
+from files.buildOutput import isUnchangedOutput, getOutputPaths, removeStaleBuildFiles
 from report.table import createFileReportRow
-from files.markdownUtils import extractHeaderValues, generateTags, findWIPItems, hasIgnoreTag
+from report.generateTaxcoReport import updateProcessReportData, updateSubjectReportData
+from files.markdownUtils import FrontMatter, generateTags, hasIgnoreTag
+from files.tokenizer import MarkdownTokens
+from context import CompileContext, CompileCache
 
+# Context of a worker process, created by initWorker
+workerContext = None
 
-# Update markdown files in the source directory
-def parseMarkdownFiles(srcDir, destDir, skipValidateDynamicLinks):
+
+"""
+Update markdown files in the source directory
+
+Args:
+    context (CompileContext): Context of the compile, the results are added to the report data in it.
+    srcDir (str): Source directory where the markdown files are located.
+    destDir (str): Destination directory where the updated markdown files will be saved.
+    skipValidateDynamicLinks (bool): Skip the validation of the dynamic links.
+    jobs (int): Amount of processes used to parse the files, 1 parses the files in this process.
+    manifest (BuildManifest): Manifest of the previous build, when given only the changed files are parsed.
+    imageMode (str): How the images are published to the build folder: 'copy', 'hardlink' or 'reflink'.
+    pipeline (bool): Read, parse and write the files at the same time, only used when the files are parsed in this process.
+    scope (ChangedFileScope): When given only the changed files and the files that depend on them are parsed.
+    linkCacheDir (str): When given the resolved dynamic links are kept in this folder between runs.
+"""
+def parseMarkdownFiles(context, srcDir, destDir, skipValidateDynamicLinks, jobs=1, manifest=None, imageMode='copy', pipeline=False, scope=None, linkCacheDir=None):
     destDirPath = Path(destDir).resolve()
     destDirPath.mkdir(parents=True, exist_ok=True)
 
     srcDirPath = Path(srcDir).resolve()
 
-    # Loop through all markdown files in the source directory
-    for filePath in Path(srcDirPath).rglob('*.md'):
-        relativePath = filePath.relative_to(srcDirPath)
+    # Make sure the links and images are validated against the current state of the content tree,
+    # indexes of a previous compile are only kept when the tree didn't change
+    refreshSourceTrees(context)
+    refreshContentIndexes(context)
+    refreshImageIndexes(context)
+
+    # Load the cache before the workers are started, so every worker gets the cached links
+    if linkCacheDir and not skipValidateDynamicLinks:
+        loadLinkCache(getContentIndex(context, srcDirPath), linkCacheDir)
+
+    filePaths = findMarkdownFiles(context, srcDirPath)
+    if scope:
+        filePaths = scope.selectFiles(filePaths)
+    changedFiles = filePaths
+
+    if manifest:
+        changedFiles = manifest.findChangedFiles(filePaths, srcDirPath, destDirPath, getContentIndex(context, srcDirPath), getImageIndex(context, srcDirPath))
+        logging.info(f"Incremental compile: {len(changedFiles)} of {len(filePaths)} files changed")
+
+    # The results are applied in the same order as the files were found, so the reports are the same as a serial run.
+    # The changed files are in the same order as the found files, so every result is applied as soon as it's parsed
+    results = parseFiles(context, changedFiles, srcDirPath, destDirPath, skipValidateDynamicLinks, jobs, imageMode, pipeline)
+    changedFileSet = set(changedFiles)
+    for filePath in filePaths:
+        if filePath in changedFileSet:
+            result = next(results)
+            if manifest:
+                manifest.updateFile(filePath, srcDirPath, result)
+        else:
+            result = manifest.getResult(filePath, srcDirPath)
+
+        applyFileResult(context, result, srcDirPath)
+
+    # The links resolved by the workers are merged already, this counts the cache hits and misses of this process
+    drainLinkCaches(context)
+    if linkCacheDir and not skipValidateDynamicLinks:
+        for contentIndex in list(context.cache.contentIndexes.values()):
+            saveLinkCache(contentIndex, linkCacheDir)
+
+    # The build folder of a previous compile is kept, without a manifest everything this compile didn't produce is removed.
+    # A changed-files compile only produces the files in its scope, so it leaves the rest of the build folder alone
+    if manifest:
+        manifest.removeStaleOutput(destDirPath, context.usedImages, srcDirPath)
+    if not scope and (not manifest or not manifest.hasPreviousBuild()):
+        context.metrics.count('staleFilesRemoved', removeStaleBuildFiles(destDirPath, getOutputPaths(filePaths, context.usedImages, srcDirPath, destDirPath)))
+
+    counters = context.metrics.counters
+    logging.info(f"Build files: {counters.get('filesWritten', 0)} written, {counters.get('filesSkipped', 0)} unchanged")
+
+# Parse the markdown files in this process, in a read/parse/write pipeline or in a process pool.
+# The results are yielded in the same order as the files, as soon as they are parsed
+def parseFiles(context, filePaths, srcDirPath, destDirPath, skipValidateDynamicLinks, jobs, imageMode='copy', pipeline=False):
+    if jobs > 1 and len(filePaths) > 1:
+        # Multiprocessing is only imported when it's used, it's a large part of the startup time
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Build the indexes before starting the workers, so they're shared with every worker instead of rebuilt by each of them
+        getImageIndex(context, srcDirPath)
+        if not skipValidateDynamicLinks:
+            getContentIndex(context, srcDirPath)
+
+        parseFile = partial(parseMarkdownFileInWorker, srcDirPath=srcDirPath, destDirPath=destDirPath, skipValidateDynamicLinks=skipValidateDynamicLinks, imageMode=imageMode)
+        chunkSize = max(1, len(filePaths) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs, initializer=initWorker, initargs=(getWorkerState(context),)) as executor:
+            for result, workerMetrics, newLinks in executor.map(parseFile, filePaths, chunksize=chunkSize):
+                context.metrics.merge(workerMetrics)
+                mergeLinkCaches(context, newLinks)
+                yield result
+        return
+
+    if pipeline and len(filePaths) > 1:
+        transform = partial(transformMarkdownFile, context, srcDirPath=srcDirPath, destDirPath=destDirPath, skipValidateDynamicLinks=skipValidateDynamicLinks, imageMode=imageMode)
+        bytesWritten = yield from runPipeline(filePaths, readMarkdownFile, transform, partial(writeParsedFile, context))
+        context.metrics.count('bytesWritten', bytesWritten)
+        return
+
+    for filePath in filePaths:
+        yield parseMarkdownFile(context, filePath, srcDirPath, destDirPath, skipValidateDynamicLinks, imageMode)
+
+# Parse a markdown file in a worker process, the metrics collected by the worker and the links it resolved are returned with the result
+def parseMarkdownFileInWorker(filePath, srcDirPath, destDirPath, skipValidateDynamicLinks, imageMode):
+    result = parseMarkdownFile(workerContext, filePath, srcDirPath, destDirPath, skipValidateDynamicLinks, imageMode)
+    newLinks = drainLinkCaches(workerContext)
+    return result, workerContext.metrics.drain(), newLinks
+
+# Find all markdown files in the source directory, skipping the ignored folders.
+# The files are found in the same traversal as the files of the content and image index
+def findMarkdownFiles(context, srcDirPath):
+    return list(getSourceTree(context, srcDirPath).markdownFiles)
+
+"""
+Parse a single markdown file and save it in the destination directory.
+This doesn't change any of the report data, instead everything that has to be reported
+is returned, so the file can also be parsed in a worker process.
+
+Returns a dict with the report list and row of the file, the taxonomies found in the dataset,
+the file names of the dynamic links and the names of the images used by the file.
+"""
+def parseMarkdownFile(context, filePath, srcDirPath, destDirPath, skipValidateDynamicLinks, imageMode='copy'):
+    result, output = transformMarkdownFile(context, filePath, readMarkdownFile(filePath), srcDirPath, destDirPath, skipValidateDynamicLinks, imageMode)
+    context.metrics.count('bytesWritten', writeParsedFile(context, output))
+    return result
+
+# Read the content of a markdown file, returns the content and the size of the file.
+# A large file is memory-mapped instead, then the content is a MappedMarkdownFile
+def readMarkdownFile(filePath):
+    with open(filePath, 'r', encoding='utf-8') as f:
+        fileSize = os.fstat(f.fileno()).st_size
+        if fileSize >= MAPPED_FILE_SIZE:
+            mappedFile = mapMarkdownFile(f)
+            if mappedFile:
+                return mappedFile, fileSize
+        return f.read(), fileSize
+
+"""
+Parse the content of a markdown file, without reading or writing the markdown file itself.
+Returns the result (see parseMarkdownFile) and the output, which is the path and content of the file in the destination directory.
+"""
+def transformMarkdownFile(context, filePath, fileData, srcDirPath, destDirPath, skipValidateDynamicLinks, imageMode='copy'):
+    metrics = context.metrics
+    relativePath = filePath.relative_to(srcDirPath)
+
+    # The time of the file is kept when it's one of the slowest files
+    with metrics.file(relativePath):
         destAndRelativePath = destDirPath / relativePath
         errors = []
         tagErrors = []
         todoItems = []
         taxonomie = []
         newTags = []
+        foundTaxonomies = []
         isDraft = False
         isIgnore = False
 
-        # Skip curtain folders
-        if any(folder in str(filePath) for folder in IGNORE_FOLDERS):
-            logging.info(f"Skipping folder: {filePath}")
-            continue
+        content, fileSize = fileData
+        metrics.count('bytesRead', fileSize)
+
+        # Of a mapped file only the header is used as content, the body is written from the mapped buffer
+        mappedFile = content if isinstance(content, MappedMarkdownFile) else None
+        if mappedFile:
+            metrics.count('filesMapped')
+
+        # Find the dynamic links, images and work-in-progress items of the content
+        with metrics.stage('tokenize'):
+            tokens = mappedFile.tokenize() if mappedFile else MarkdownTokens(content)
 
-        with open(filePath, 'r', encoding='utf-8') as f:
-            content = f.read()
+        with metrics.stage('linkValidation'):
+            if mappedFile:
+                newLinks, linkErrors, linkTargets = resolveDynamicLinks(context, filePath, tokens.links, skipValidateDynamicLinks)
+                content = mappedFile.replaceDynamicLinks(tokens.links, newLinks)
+            else:
+                content, linkErrors, linkTargets = updateDynamicLinks(context, filePath, content, tokens.links, skipValidateDynamicLinks)
+
+        with metrics.stage('imageCopy'):
+            imageErrors, imageNames = copyImages(context, tokens.images, srcDirPath, destDirPath, imageMode)
+
+        frontMatter = FrontMatter(content)
+        existingTags = frontMatter.get('tags')
+        difficulty = frontMatter.get('difficulty')
 
-        content, linkErrors = updateDynamicLinks(filePath, content, skipValidateDynamicLinks)
-        imageErrors = copyImages(content, srcDirPath, destDirPath)
-        existingTags = extractHeaderValues(content, 'tags')
-        difficulty = extractHeaderValues(content, 'difficulty')
-            
         # Check if the file has a ignore tag
-        if hasIgnoreTag(content, filePath):
+        if hasIgnoreTag(frontMatter, filePath):
             isIgnore = True
             errors.append(ERROR_IGNORE_TAG_USED)
         else:
-            taxonomie = extractHeaderValues(content, 'taxonomie')
-            newTags, tagErrors = generateTags(taxonomie, existingTags, filePath)
-            todoItems = findWIPItems(content)
+            taxonomie = frontMatter.get('taxonomie')
+            newTags, tagErrors, foundTaxonomies = generateTags(context, taxonomie, existingTags, filePath)
+            todoItems = tokens.wipItems
 
             if(todoItems):
                 errors.append(ERROR_WIP_FOUND + "<br>" + '<br>'.join([f"{item}" for item in todoItems]))
@@ -59,30 +221,91 @@ def parseMarkdownFiles(srcDir, destDir, skipValidateDynamicLinks):
         if(errors and not isIgnore):
             isDraft = True
 
-        appendFileToSpecificList(errors, todoItems, filePath, srcDirPath, taxonomie, newTags)
-        saveParsedFile(filePath, taxonomie, newTags, difficulty, isDraft, isIgnore, content, destAndRelativePath)
+        reportList, reportRow = createFileReport(errors, todoItems, filePath, srcDirPath, taxonomie, newTags)
+        newContent = createParsedContent(filePath, taxonomie, newTags, difficulty, isDraft, isIgnore, frontMatter.body)
+        if mappedFile:
+            newContent = mappedFile.createOutput(newContent)
+
+        metrics.count('filesParsed')
+
+        result = {
+            'reportList': reportList,
+            'reportRow': reportRow,
+            'foundTaxonomies': foundTaxonomies,
+            'linkTargets': linkTargets,
+            'images': imageNames,
+        }
+        return result, (destAndRelativePath, newContent)
+
+"""
+Add the result of a parsed file to the report data of the context.
+Before the script runs it pre-fills the report with all the taxonomies
+This is done so the report has all the taxonomies even if they are not used
+After this the report is updated with the taxonomies found in the file
+When the result stream is enabled the file is written to it right away
+"""
+def applyFileResult(context, result, srcDirPath):
+    context.getReportList(result['reportList']).append(result['reportRow'])
+    if context.resultStream:
+        context.resultStream.writeFile(result)
 
-# Fill the different lists used for the report
-def appendFileToSpecificList(errors, todoItems, filePath, srcDir, taxonomie, tags):
+    for tc1, tc2, tc3, tc4 in result['foundTaxonomies']:
+        updateProcessReportData(context, tc1, tc2)
+        updateSubjectReportData(context, tc1, tc2, tc3, tc4)
+
+    # The images are resolved again, because a worker process records the used images in its own context
+    imageIndex = getImageIndex(context, srcDirPath)
+    for imageName in result['images']:
+        foundImagePath = imageIndex.resolve(imageName)
+        if foundImagePath:
+            context.usedImages.add(foundImagePath)
+
+# Select the report list and create the report row of a file
+def createFileReport(errors, todoItems, filePath, srcDir, taxonomie, tags):
     if errors:
-        icon, targetList = WARNING_ICON, failedFiles  # Default case
+        icon, targetList = WARNING_ICON, 'failedFiles'  # Default case
 
         if todoItems:
-            icon, targetList = TODO_ITEMS_ICON, WIPFiles
+            icon, targetList = TODO_ITEMS_ICON, 'WIPFiles'
         elif ERROR_NO_TAXCO_FOUND in errors:
-            icon, targetList = FAIL_CROSS_ICON, failedFiles
+            icon, targetList = FAIL_CROSS_ICON, 'failedFiles'
         elif ERROR_TAXCO_NOT_NEEDED in errors:
-            icon, targetList = NOT_NEEDED_ICON, failedFiles
+            icon, targetList = NOT_NEEDED_ICON, 'failedFiles'
         elif ERROR_IGNORE_TAG_USED in errors:
-            icon, targetList = WARNING_ICON, ignoredFiles
+            icon, targetList = WARNING_ICON, 'ignoredFiles'
 
-        targetList.append(createFileReportRow(icon, filePath, srcDir, taxonomie, tags, errors))
+        return targetList, createFileReportRow(icon, filePath, srcDir, taxonomie, tags, errors)
     else:
-        parsedFiles.append(createFileReportRow(SUCCESS_ICON, filePath, srcDir, taxonomie, tags, errors))
+        return 'parsedFiles', createFileReportRow(SUCCESS_ICON, filePath, srcDir, taxonomie, tags, errors)
+
+# The data of the context a worker process needs to parse the files
+def getWorkerState(context):
+    return {
+        'taxonomyEntries': context.taxonomyEntries,
+        'taxonomyLookup': context.taxonomyLookup,
+        'contentReport': context.contentReport,
+        'contentIndexes': dict(context.cache.contentIndexes),
+        'imageIndexes': dict(context.cache.imageIndexes),
+    }
+
+# Create the context of a worker process from the state of the main process
+def initWorker(state):
+    global workerContext
+
+    cache = CompileCache()
+    cache.contentIndexes.update(state['contentIndexes'])
+    cache.imageIndexes.update(state['imageIndexes'])
+    for contentIndex in cache.contentIndexes.values():
+        contentIndex.linkCache.collectNew = True
+
+    workerContext = CompileContext(cache)
+    workerContext.taxonomyEntries = state['taxonomyEntries']
+    workerContext.taxonomyLookup = state['taxonomyLookup']
+    workerContext.contentReport = state['contentReport']
 
 
 # Combines everything into a new md file
-def saveParsedFile(filePath, taxonomie, tags, difficulty, isDraft, isIgnore, content, destPath):
+def createParsedContent(filePath, taxonomie, tags, difficulty, isDraft, isIgnore, body):
     newContent = (
         f"---\ntitle: {filePath.stem}\ntaxonomie: {taxonomie}\ntags:\n" +
         '\n'.join([f"- {tag}" for tag in tags]) +
@@ -98,9 +321,36 @@ def saveParsedFile(filePath, taxonomie, tags, difficulty, isDraft, isIgnore, con
     if isIgnore:
         newContent += "ignore: true \n"
 
-    newContent += "---" + content.split('---', 2)[-1]
+    return newContent + "---" + body
+
+# Write a parsed file to the destination directory, returns the amount of bytes written.
+# A file that is already in the build folder with the same content isn't written again.
+# The content of a mapped file is written in chunks, straight from the mapped buffer.
+# Every folder is only created once per run
+def writeParsedFile(context, output):
+    destPath, newContent = output
+
+    if destPath.parent not in context.createdFolders:
+        destPath.parent.mkdir(parents=True, exist_ok=True)
+        context.createdFolders.add(destPath.parent)
+
+    if isinstance(newContent, MappedOutput):
+        try:
+            return writeOutputChunks(context, destPath, newContent.chunks, newContent.size)
+        finally:
+            newContent.close()
+
+    data = newContent.encode('utf-8')
+    return writeOutputChunks(context, destPath, lambda: (data,), len(data))
 
-    destPath.parent.mkdir(parents=True, exist_ok=True)
+# Write the chunks of a file, unless the file already has the same content. chunks() returns the chunks (bytes)
+def writeOutputChunks(context, destPath, chunks, size):
+    if isUnchangedOutput(destPath, chunks(), size):
+        context.metrics.count('filesSkipped')
+        return 0
 
-    with open(destPath, 'w', encoding='utf-8') as f:
-        f.write(newContent)
+    with open(destPath, 'wb') as f:
+        for chunk in chunks():
+            f.write(chunk)
+    context.metrics.count('filesWritten')
+    return size
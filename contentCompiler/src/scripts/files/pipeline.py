@@ -0,0 +1,112 @@
+import queue, threading
+from collections import deque
+
+PIPELINE_QUEUE_SIZE = 64                                        # Maximum amount of files waiting between two stages
+PIPELINE_WRITERS = 4                                            # Amount of writer threads
+
+# Marks the end of the items in a queue
+END_OF_QUEUE = object()
+
+
+"""
+Run the items through a read, transform and write stage at the same time.
+A reader thread prefetches the items, the transform runs in the calling thread and a pool of
+writer threads writes the output. The stages are connected by bounded queues, so the reader can't
+run far ahead of the transform and the transform can't run far ahead of the writers.
+The results of the transform are yielded in the same order as the items, every result as soon as its output is
+written, while the next items are still read and transformed.
+
+Args:
+    items (list): Items to process, like the paths of the files.
+    read (function): read(item) returns the data of the item, runs in the reader thread.
+    transform (function): transform(item, data) returns a tuple (result, output), runs in the calling thread.
+    write (function): write(output) writes the output and returns the amount of bytes written, runs in a writer thread.
+    queueSize (int): Size of the queues between the stages.
+    writers (int): Amount of writer threads.
+
+Yields the results of the transform, returns the total amount of bytes written (the value of yield from).
+"""
+def runPipeline(items, read, transform, write, queueSize=PIPELINE_QUEUE_SIZE, writers=PIPELINE_WRITERS):
+    readQueue = queue.Queue(maxsize=queueSize)
+    writeQueue = queue.Queue(maxsize=queueSize)
+    stopEvent = threading.Event()
+    writeErrors = []
+    bytesWritten = [0] * writers
+
+    def readItems():
+        for item in items:
+            if stopEvent.is_set():
+                break
+            try:
+                readQueue.put((item, read(item), None))
+            except Exception as e:
+                readQueue.put((item, None, e))
+                break
+        readQueue.put(END_OF_QUEUE)
+
+    def writeItems(writerIndex):
+        while True:
+            entry = writeQueue.get()
+            if entry is END_OF_QUEUE:
+                break
+            output, written = entry
+            try:
+                # After an error the queue is still emptied, so the transform stage never blocks on a full queue
+                if not writeErrors:
+                    bytesWritten[writerIndex] += write(output)
+            except Exception as e:
+                writeErrors.append(e)
+            finally:
+                written.set()
+
+    readerThread = threading.Thread(target=readItems, daemon=True)
+    writerThreads = [threading.Thread(target=writeItems, args=(index,), daemon=True) for index in range(writers)]
+    readerThread.start()
+    for writerThread in writerThreads:
+        writerThread.start()
+
+    # Results of which the output is queued, with the event that is set when the output is written
+    pending = deque()
+    try:
+        while True:
+            entry = readQueue.get()
+            if entry is END_OF_QUEUE:
+                break
+
+            item, data, readError = entry
+            if readError:
+                raise readError
+            if writeErrors:
+                raise writeErrors[0]
+
+            result, output = transform(item, data)
+            written = threading.Event()
+            writeQueue.put((output, written))
+            pending.append((result, written))
+
+            while pending and pending[0][1].is_set():
+                yield pending.popleft()[0]
+
+        while pending:
+            result, written = pending.popleft()
+            written.wait()
+            if writeErrors:
+                raise writeErrors[0]
+            yield result
+    finally:
+        # Stop the reader and wait until everything that is queued is written
+        stopEvent.set()
+        while readerThread.is_alive():
+            try:
+                readQueue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for writerThread in writerThreads:
+            writeQueue.put(END_OF_QUEUE)
+        for writerThread in writerThreads:
+            writerThread.join()
+
+    if writeErrors:
+        raise writeErrors[0]
+
+    return sum(bytesWritten)
@@ -0,0 +1,97 @@
+import os, shutil, logging
+from files.hashing import hashFile
+
+FICLONE = 0x40049409                                            # Linux ioctl to clone a file on a copy-on-write filesystem (btrfs, xfs)
+
+
+"""
+Publish an image from the source folder to the build folder.
+Every image is published at most once per run, and an image that is already in the build folder
+with the same content is skipped. Depending on the mode the image is copied, hardlinked or cloned;
+when a hardlink or clone isn't possible (e.g. the build folder is on another filesystem) the image is copied.
+
+Args:
+    context (CompileContext): Context of the compile, the published images are recorded in it.
+    sourcePath (Path): Path of the image in the source folder.
+    destPath (Path): Path of the image in the build folder.
+    mode (str): 'copy', 'hardlink' or 'reflink'.
+"""
+def publishImage(context, sourcePath, destPath, mode='copy'):
+    metrics = context.metrics
+    publishedImages = context.publishedImages
+
+    if destPath in publishedImages:
+        metrics.count('imagesSkipped')
+        return
+    publishedImages.add(destPath)
+
+    if isPublished(sourcePath, destPath):
+        metrics.count('imagesSkipped')
+        return
+
+    destPath.parent.mkdir(parents=True, exist_ok=True)
+
+    # Write next to the destination and replace it, so a worker process never sees a half written image
+    tempPath = destPath.with_name(f".{destPath.name}.{os.getpid()}.tmp")
+    try:
+        if mode == 'hardlink' and linkImage(sourcePath, tempPath):
+            metrics.count('imagesLinked')
+        elif mode == 'reflink' and cloneImage(sourcePath, tempPath):
+            metrics.count('imagesLinked')
+        else:
+            shutil.copy2(sourcePath, tempPath)
+            metrics.count('imagesCopied')
+            metrics.count('bytesWritten', sourcePath.stat().st_size)
+
+        os.replace(tempPath, destPath)
+    finally:
+        if tempPath.exists():
+            os.remove(tempPath)
+
+# Checks if the image in the build folder has the same content as the source image
+def isPublished(sourcePath, destPath):
+    try:
+        sourceStat = sourcePath.stat()
+        destStat = destPath.stat()
+    except FileNotFoundError:
+        return False
+
+    if os.path.samestat(sourceStat, destStat):
+        return True
+    if sourceStat.st_size != destStat.st_size:
+        return False
+    if sourceStat.st_mtime_ns == destStat.st_mtime_ns:
+        return True
+
+    # Same size but touched, only compare the content. The timestamp is updated so the next run doesn't hash again
+    if hashFile(sourcePath) == hashFile(destPath):
+        os.utime(destPath, ns=(sourceStat.st_atime_ns, sourceStat.st_mtime_ns))
+        return True
+    return False
+
+# Hardlink the image, returns False when the filesystem doesn't allow it
+def linkImage(sourcePath, destPath):
+    try:
+        os.link(sourcePath, destPath)
+        return True
+    except OSError as e:
+        logging.debug(f"Can't hardlink image {sourcePath}, copying instead: {str(e)}")
+        return False
+
+# Clone the image on a copy-on-write filesystem, returns False when the filesystem doesn't support it
+def cloneImage(sourcePath, destPath):
+    try:
+        import fcntl
+    except ImportError:
+        return False
+
+    try:
+        with open(sourcePath, 'rb') as source, open(destPath, 'wb') as dest:
+            fcntl.ioctl(dest.fileno(), FICLONE, source.fileno())
+        shutil.copystat(sourcePath, destPath)
+        return True
+    except OSError as e:
+        logging.debug(f"Can't clone image {sourcePath}, copying instead: {str(e)}")
+        if destPath.exists():
+            os.remove(destPath)
+        return False
@@ -0,0 +1,160 @@
+import os, logging
+from pathlib import Path
+from config import IGNORE_FOLDERS
+
+SCAN_THREADS = 8                                                # Amount of threads that list the folders of a large tree
+SCAN_PARALLEL_FOLDERS = 16                                      # Minimum amount of folders on one level of the tree before the threads are used
+
+
+"""
+All the files of a source tree, listed with a single traversal that is shared by the markdown file
+list, the content index and the image index.
+The folders are listed with os.scandir one level of the tree at a time, the folders of a large level
+are listed by a pool of threads (os.scandir doesn't hold the GIL while it waits on the filesystem).
+Afterwards the folders are put in the same order as os.walk, so the first file found for a name and
+the order of the markdown files don't depend on the amount of threads.
+A folder which relative path contains one of the IGNORE_FOLDERS is decided on once, when it's listed: none of
+the markdown files below it are compiled. Its files are still part of the tree, because dynamic links and
+images can point to them.
+
+Args:
+    rootPath (Path): Root of the tree, like the source directory or a content folder.
+    metrics (CompileMetrics): Metrics of the compile that scans the tree.
+    threads (int): Amount of threads used for a large level of the tree, 1 lists every folder in this thread.
+"""
+class SourceTree:
+    def __init__(self, rootPath, metrics, threads=SCAN_THREADS):
+        self.rootPath = Path(rootPath)
+        self.folders = {}                                           # Modification time of every folder, in the same order as os.walk
+        self.files = []                                             # Folder and file names of every folder, in the same order as os.walk
+        self.markdownFiles = []                                     # Markdown files which are not in an ignored folder
+        self.scan(metrics, threads)
+
+    def scan(self, metrics, threads):
+        metrics.count('osWalkCalls')
+        listedFolders = listTree(str(self.rootPath), threads)
+        metrics.count('foldersScanned', len(listedFolders))
+
+        # Walk the listed folders depth first, in the same order as os.walk (and Path.rglob)
+        rootFolder = str(self.rootPath)
+        stack = [(rootFolder, False)]
+        while stack:
+            folder, isIgnored = stack.pop()
+            if folder not in listedFolders:
+                continue
+            mtime, fileNames, subFolders = listedFolders[folder]
+
+            if not isIgnored and folder != rootFolder and isIgnoredPath(os.path.relpath(folder, rootFolder)):
+                logging.info(f"Skipping folder: {folder}")
+                isIgnored = True
+
+            self.folders[folder] = mtime
+            self.files.append((folder, fileNames))
+            if not isIgnored:
+                self.addMarkdownFiles(folder, fileNames)
+
+            stack.extend((subFolder, isIgnored) for subFolder in reversed(subFolders))
+
+    def addMarkdownFiles(self, folder, fileNames):
+        folderPath = Path(folder)
+        for fileName in fileNames:
+            if not fileName.endswith('.md'):
+                continue
+            if isIgnoredPath(fileName):
+                logging.info(f"Skipping file: {folder}/{fileName}")
+                continue
+            self.markdownFiles.append(folderPath / fileName)
+
+    # Paths of all the files in the tree, in the same order as os.walk
+    def iterFilePaths(self):
+        for folder, fileNames in self.files:
+            folderPath = Path(folder)
+            for fileName in fileNames:
+                yield folderPath / fileName
+
+    # Checks if the tree still matches the filesystem. Adding, removing or renaming a file or folder
+    # changes the modification time of the folder it's in, so only the folders have to be checked
+    def isCurrent(self):
+        return isFolderStateCurrent(self.folders)
+
+# Checks if a path (relative to the root of the tree) is in one of the ignored folders
+def isIgnoredPath(relativePath):
+    return any(ignoreFolder in relativePath for ignoreFolder in IGNORE_FOLDERS)
+
+"""
+List all the folders of a tree, one level at a time.
+Returns a dict with the modification time, the file names and the sub folders of every folder.
+Like os.walk a symlink to a folder isn't followed and a folder that can't be listed is skipped.
+"""
+def listTree(rootFolder, threads):
+    listedFolders = {}
+    executor = None
+    level = [rootFolder]
+
+    try:
+        while level:
+            if threads > 1 and len(level) >= SCAN_PARALLEL_FOLDERS:
+                if executor is None:
+                    from concurrent.futures import ThreadPoolExecutor
+                    executor = ThreadPoolExecutor(max_workers=threads)
+                listings = executor.map(listFolder, level)
+            else:
+                listings = map(listFolder, level)
+
+            nextLevel = []
+            for folder, listing in zip(level, listings):
+                if listing is None:
+                    continue
+                listedFolders[folder] = listing
+                nextLevel.extend(listing[2])
+            level = nextLevel
+    finally:
+        if executor:
+            executor.shutdown()
+
+    return listedFolders
+
+# List a single folder, returns its modification time, file names and sub folders, or None when it can't be listed
+def listFolder(folder):
+    fileNames = []
+    subFolders = []
+
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                try:
+                    isFolder = entry.is_dir()
+                except OSError:
+                    isFolder = False
+
+                if not isFolder:
+                    fileNames.append(entry.name)
+                elif not entry.is_symlink():
+                    subFolders.append(entry.path)
+        return os.stat(folder).st_mtime_ns, fileNames, subFolders
+    except OSError as e:
+        logging.debug(f"Can't list folder {folder}: {str(e)}")
+        return None
+
+# Checks if none of the folders changed since their modification time was recorded
+def isFolderStateCurrent(folders):
+    try:
+        return all(os.stat(folder).st_mtime_ns == mtime for folder, mtime in folders.items())
+    except OSError:
+        return False
+
+# Get the tree of a folder, the tree is only scanned the first time it is requested
+def getSourceTree(context, rootPath):
+    sourceTrees = context.cache.sourceTrees
+    key = str(Path(rootPath).resolve())
+    if key not in sourceTrees:
+        sourceTrees[key] = SourceTree(Path(key), context.metrics)
+    return sourceTrees[key]
+
+# Remove the trees that changed, the other trees are kept for the next compile
+def refreshSourceTrees(context):
+    sourceTrees = context.cache.sourceTrees
+    with context.cache.lock:
+        for key, sourceTree in list(sourceTrees.items()):
+            if not sourceTree.isCurrent():
+                del sourceTrees[key]
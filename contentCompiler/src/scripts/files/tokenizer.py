@@ -0,0 +1,72 @@
+import re
+from collections import namedtuple
+from config import TODO_PATTERN, TAXONOMIE_PATTERN
+
+# Compiled patterns, compiled once when the module is imported instead of on every call
+TAXONOMIE_REGEX = re.compile(TAXONOMIE_PATTERN)
+LINK_REGEX = re.compile(r'\[\[(?P<target>[^"\[][^\]]*?)\]\]')   # Dynamic link [[...]]
+IMAGE_REGEX = re.compile(
+    r'!\[\[(?P<embed>[^\]]+)\]\]'                               # Image embed ![[...]], also with a quoted target
+    r'|!\[(?P<alt>[^\]]*)\]\((?P<src>[^)]+)\)'                  # Markdown image ![alt](src)
+)
+WIP_REGEX = re.compile(TODO_PATTERN)                            # Work-in-progress marker
+# The same patterns for the UTF-8 bytes of a memory-mapped file, all the delimiters are ASCII so they match the same tokens
+LINK_BUFFER_REGEX = re.compile(LINK_REGEX.pattern.encode('utf-8'))
+IMAGE_BUFFER_REGEX = re.compile(IMAGE_REGEX.pattern.encode('utf-8'))
+WIP_BUFFER_REGEX = re.compile(WIP_REGEX.pattern.encode('utf-8'))
+
+# A dynamic link, text is the complete link including the brackets, start and end are the position in the content
+DynamicLink = namedtuple('DynamicLink', ['text', 'target', 'start', 'end'])
+# An image reference, the link of an image embed is also a dynamic link (unless its target is quoted) and is rewritten the same way
+ImageReference = namedtuple('ImageReference', ['path', 'isDynamicLink'])
+
+
+"""
+The dynamic links, images and work-in-progress markers of a markdown file.
+Every kind of token has its own scan over the content, because the tokens can overlap: a work-in-progress marker
+can be part of the text of a link or the alt text of an image, and an image embed is a dynamic link as well.
+A single scan that finds the overlapping tokens has to stop at every [, ! and - of the content, three scans that each
+search for the literal start of their token ([[, ! and -=) are faster.
+
+Args:
+    content (str): Content of the markdown file.
+    buffer (bytes-like): Instead of the content, the UTF-8 bytes of a (memory-mapped) file. The text of the tokens is
+                         decoded, the positions of the links are byte positions in the buffer.
+    start (int): Position in the buffer where the scan starts.
+"""
+class MarkdownTokens:
+    def __init__(self, content='', buffer=None, start=0):
+        self.links = []
+        self.images = []
+        self.wipItems = []
+        if buffer is None:
+            self.tokenize(content)
+        else:
+            self.tokenizeBuffer(buffer, start)
+
+    def tokenize(self, content):
+        for match in LINK_REGEX.finditer(content):
+            self.links.append(DynamicLink(match.group(0), match.group('target'), match.start(), match.end()))
+
+        for match in IMAGE_REGEX.finditer(content):
+            self.addImage(match.group('embed'), match.group('src'))
+
+        self.wipItems = WIP_REGEX.findall(content)
+
+    # Same as tokenize, only the matched tokens are decoded so the buffer is never copied as a whole
+    def tokenizeBuffer(self, buffer, start):
+        for match in LINK_BUFFER_REGEX.finditer(buffer, start):
+            self.links.append(DynamicLink(match.group(0).decode('utf-8'), match.group('target').decode('utf-8'), match.start(), match.end()))
+
+        for match in IMAGE_BUFFER_REGEX.finditer(buffer, start):
+            embed, src = match.group('embed', 'src')
+            self.addImage(embed.decode('utf-8') if embed is not None else None, src.decode('utf-8') if src is not None else None)
+
+        self.wipItems = [match.group(0).decode('utf-8') for match in WIP_BUFFER_REGEX.finditer(buffer, start)]
+
+    # An embed with a quoted target isn't a dynamic link, so only the other embeds are rewritten like a dynamic link
+    def addImage(self, embed, src):
+        if embed is not None:
+            self.images.append(ImageReference(embed, not embed.startswith('"')))
+        else:
+            self.images.append(ImageReference(src, False))
@@ -0,0 +1,113 @@
+from array import array
+from config import LT, OI, PI, DT, SUCCESS_ICON, FAIL_CIRCLE_ICON, NOT_NECESSARY_ICON
+
+CATEGORIES = ['TC2', LT, OI, PI, DT]
+LEVEL_COUNT = 3
+FILE_TYPES = {'LT': LT, 'OI': OI, 'PI': PI, 'DT': DT}
+STATE_ICONS = {'covered': SUCCESS_ICON, 'missing': FAIL_CIRCLE_ICON, 'notNecessary': NOT_NECESSARY_ICON}
+CATEGORY_BITS = {category: tuple(1 << (index * LEVEL_COUNT + level) for level in range(LEVEL_COUNT)) for index, category in enumerate(CATEGORIES)}
+
+
+"""
+Coverage of the taxonomie codes of the dataset, per category (TC2, LT, OI, PI, DT) and level.
+Every row of the matrix is a TC1 (taxco report) or a TC3 and TC1 combination (content report) and
+stores its cells in three bitsets with one bit per category and level:
+    offered:  the cell has to be covered by a file, it isn't marked with an X in the dataset
+    optional: the cell is offered, but isn't reported as missing when no file covers it
+    covered:  a file with this taxonomie code exists
+A cell is covered in place with a single bit operation, so a found taxonomie code doesn't allocate anything.
+The rows are grouped by the first part of their key, in the order they were added, which is the order of the report tables.
+"""
+class CoverageMatrix:
+    def __init__(self):
+        self.rows = {}                                              # Row index by key
+        self.groups = {}                                            # Keys of the rows by the first part of the key
+        self.labels = []                                            # Extra columns of every row, like the proces and processtap
+        self.offered = array('H')
+        self.optional = array('H')
+        self.covered = array('H')
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    # Checks if there is a row which key starts with the given value, like a TC3 in the content report
+    def hasGroup(self, group):
+        return group in self.groups
+
+    """
+    Add a row to the matrix with the levels of the dataset, a level marked with an X is not offered.
+
+    Args:
+        key (tuple): Key of the row.
+        levels (dict): The three dataset levels of every category.
+        label (tuple): Extra columns of the row.
+    """
+    def addRow(self, key, levels, label=()):
+        offered = 0
+        for category, values in levels.items():
+            bits = CATEGORY_BITS[category]
+            for level in range(LEVEL_COUNT):
+                if values[level] != 'X':
+                    offered |= bits[level]
+
+        self.rows[key] = len(self.labels)
+        self.groups.setdefault(key[0], []).append(key)
+        self.labels.append(label)
+        self.offered.append(offered)
+        self.optional.append(0)
+        self.covered.append(0)
+
+    """
+    Set the state of a cell from its value like it's written in the report data:
+    NOT_NECESSARY_ICON (not offered), 'x' (offered), 'v' or 'g' (covered), any other value is offered but optional.
+    """
+    def setCell(self, row, category, level, value):
+        bit = getCellBit(category, level)
+        isOffered, isOptional, isCovered = getCellState(value)
+        self.offered[row] = self.offered[row] | bit if isOffered else self.offered[row] & ~bit
+        self.optional[row] = self.optional[row] | bit if isOptional else self.optional[row] & ~bit
+        self.covered[row] = self.covered[row] | bit if isCovered else self.covered[row] & ~bit
+
+    # Checks if a cell isn't offered, the cell is marked with an X in the dataset
+    def isNotNecessary(self, row, category, level):
+        return not self.offered[row] & getCellBit(category, level)
+
+    # Mark a cell of a row as covered, a cell that isn't offered stays not necessary
+    def cover(self, key, category, level):
+        row = self.rows[key]
+        self.covered[row] |= self.offered[row] & getCellBit(category, level)
+
+    # The states of the cells of a category: 'covered', 'missing' or 'notNecessary'
+    def getStates(self, row, category):
+        offered, optional, covered = self.offered[row], self.optional[row], self.covered[row]
+        states = []
+        for bit in CATEGORY_BITS[category]:
+            if covered & bit:
+                states.append('covered')
+            elif offered & bit and not optional & bit:
+                states.append('missing')
+            else:
+                states.append('notNecessary')
+        return states
+
+    # The report icons of the cells of a category
+    def getStatuses(self, row, category):
+        return [STATE_ICONS[state] for state in self.getStates(row, category)]
+
+    # The keys and row indexes of the rows, grouped by the first part of the key
+    def iterRows(self):
+        for keys in self.groups.values():
+            for key in keys:
+                yield key, self.rows[key]
+
+# The bit of a category and level in the bitsets of a row
+def getCellBit(category, level):
+    return CATEGORY_BITS[category][level]
+
+# The offered, optional and covered state of a cell from its value in the report data
+def getCellState(value):
+    if value == NOT_NECESSARY_ICON:
+        return False, False, False
+    if value == 'v' or value == 'g':
+        return True, False, True
+    return True, value != 'x', False
@@ -1,10 +1,10 @@
-from report.table import formatFileReportTable, formatImageReportTable
-from config import WIPFiles, failedFiles, failedImages, parsedFiles, ignoredFiles
+from report.table import writeFileReportTable, writeImageReportTable
 from config import WARNING_ICON, FAIL_CROSS_ICON, NOT_NEEDED_ICON
 
 
 # Generate the report based on the taxonomie report, success, and failed reports.
-def generateContentReport(reportPath):
+# The rows are streamed to the report file in sorted order.
+def generateContentReport(context, reportPath):
     with open(reportPath, "w", encoding="utf-8") as f:
         f.write('---\ndraft: true\n---\n')
         
@@ -12,7 +12,7 @@ def generateContentReport(reportPath):
         f.write('*Doel: De onderstaande bestanden hebben nog todo items in de markdown staan.*\n')
         f.write('Deze todo items moeten nog worden afgehandeld.\n')
         f.write('\n')
-        f.write(formatFileReportTable(sorted(WIPFiles, key=lambda x: x['file'])))
+        writeFileReportTable(f, context.WIPFiles.sortedRows())
 
         f.write('\n\n')
 
@@ -22,23 +22,23 @@ def generateContentReport(reportPath):
         f.write(WARNING_ICON + ' Dit bestand bevat fouten. Zie de *Errors* kolom.\n')
         f.write(NOT_NEEDED_ICON + 'Dit bestand bevat taxonomie codes die niet nodig zijn.\n')
         f.write('\n')
-        f.write(formatFileReportTable(sorted(failedFiles, key=lambda x: x['file'])))
+        writeFileReportTable(f, context.failedFiles.sortedRows())
 
         f.write('\n\n')
 
         f.write("## Gefaalde images\n")
         f.write("*Doel: De onderstaande images worden niet gebruikt in een bestand.*\n\n")
-        f.write(formatImageReportTable(sorted(failedImages, key=lambda x: x['image'])))
+        writeImageReportTable(f, context.failedImages.sortedRows())
         
         f.write('\n\n')
         
         f.write("## Genegeerde bestanden\n")
         f.write("*Doel: De onderstaande bestanden worden genegeerd.*\n\n")
-        f.write(formatFileReportTable(sorted(ignoredFiles, key=lambda x: x['file'])))
+        writeFileReportTable(f, context.ignoredFiles.sortedRows())
 
         f.write('\n\n')
 
         f.write("## Geslaagde bestanden\n")
         f.write("*Doel: De onderstaande bestanden zijn succesvol verwerkt.*\n")
         f.write('\n')
-        f.write(formatFileReportTable(sorted(parsedFiles, key=lambda x: x['file'])))
+        writeFileReportTable(f, context.parsedFiles.sortedRows())
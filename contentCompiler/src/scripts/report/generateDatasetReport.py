@@ -0,0 +1,28 @@
+from report.table import writeMarkdownTable, formatCell
+from config import FAIL_CROSS_ICON, WARNING_ICON
+
+
+# Generate the report with the rows of the dataset that have errors, in the order of the dataset.
+def generateDatasetReport(context, reportPath):
+    with open(reportPath, "w", encoding="utf-8") as f:
+        f.write('---\ndraft: true\n---\n')
+
+        f.write("## Dataset fouten\n")
+        f.write("*Doel: De onderstaande rijen van de dataset bevatten fouten.*\n\n")
+        f.write(FAIL_CROSS_ICON + ' Deze rij kan niet gebruikt worden en is niet meegenomen.\n')
+        f.write(WARNING_ICON + ' Deze rij is wel meegenomen, maar bevat fouten. Zie de *Errors* kolom.\n')
+        f.write('\n')
+        writeDatasetReportTable(f, context.datasetDiagnostics)
+
+# Write the table with the dataset rows that have errors
+def writeDatasetReportTable(f, datasetReport):
+    headers = ["Status", "Rij", "TC1", "Onderwerp", "Errors"]
+    rows = ([
+        row['status'],
+        str(row['row']),
+        row['tc1'],
+        row['tc3'],
+        formatCell(row['errors'])
+    ] for row in datasetReport)
+
+    writeMarkdownTable(f, headers, rows)
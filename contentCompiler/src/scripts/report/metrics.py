@@ -0,0 +1,85 @@
+import time, json, heapq, threading
+from contextlib import contextmanager
+
+METRICS_TOP_FILES = 20
+
+
+"""
+Timings and counters of a compilation.
+Stage timers add up, so a stage that runs for every file (like the link validation) reports the
+total time spent in it. Only the slowest files are kept, so the memory use doesn't grow with the
+amount of files. Metrics collected in a worker process are drained and merged in the main process.
+The counters can also be updated from the writer threads of the pipeline.
+
+Args:
+    topFiles (int): Amount of slowest files that are kept.
+"""
+class CompileMetrics:
+    def __init__(self, topFiles=METRICS_TOP_FILES):
+        self.topFiles = topFiles
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.stages = {}
+        self.counters = {}
+        self.slowestFiles = []
+
+    # Time a stage of the compilation, the time is added to the earlier time of the same stage
+    @contextmanager
+    def stage(self, name):
+        startTime = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.addStageTime(name, time.perf_counter() - startTime)
+
+    # Time the processing of a single file
+    @contextmanager
+    def file(self, filePath):
+        startTime = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.addFileTime(str(filePath), time.perf_counter() - startTime)
+
+    def addStageTime(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def addFileTime(self, filePath, seconds):
+        if len(self.slowestFiles) < self.topFiles:
+            heapq.heappush(self.slowestFiles, (seconds, filePath))
+        else:
+            heapq.heappushpop(self.slowestFiles, (seconds, filePath))
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    # Return the collected metrics and start again, used to send the metrics of a worker to the main process
+    def drain(self):
+        data = {'stages': self.stages, 'counters': self.counters, 'slowestFiles': self.slowestFiles}
+        self.reset()
+        return data
+
+    # Add the metrics of a worker process
+    def merge(self, data):
+        for name, seconds in data['stages'].items():
+            self.addStageTime(name, seconds)
+        for name, amount in data['counters'].items():
+            self.count(name, amount)
+        for seconds, filePath in data['slowestFiles']:
+            self.addFileTime(filePath, seconds)
+
+    def toDict(self, totalSeconds):
+        return {
+            'totalSeconds': round(totalSeconds, 6),
+            'stages': {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            'counters': dict(sorted(self.counters.items())),
+            'slowestFiles': [{'file': filePath, 'seconds': round(seconds, 6)} for seconds, filePath in sorted(self.slowestFiles, reverse=True)],
+        }
+
+    # Write the metrics as a JSON file
+    def save(self, metricsPath, totalSeconds):
+        with open(metricsPath, 'w', encoding='utf-8') as f:
+            json.dump(self.toDict(totalSeconds), f, indent=2, ensure_ascii=False)
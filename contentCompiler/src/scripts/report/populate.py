@@ -1,67 +1,44 @@
-from config import dataset, taxcoReport, contentReport
-from config import TC1_COL, TC2_COL, TC3_COL, PROCES_COL, PROCESSTAP_COL, NOT_NECESSARY_ICON, LT_COL, DT_COL, OI_COL, PI_COL, LT, DT, OI, PI
+from config import NOT_NECESSARY_ICON, LT, DT, OI, PI
 
 
 """
 Fills the taxco report with the data from the dataset
 Every TC1 code is the unique identifier
 """
-def populateTaxcoReport():
-    global taxcoReport
+def populateTaxcoReport(context):
+    taxcoReport = context.taxcoReport
 
-    for row in dataset[1:]:
-        tc1 = row[TC1_COL]
-        tc2 = row[TC2_COL]
-        proces = row[PROCES_COL]
-        processtap = row[PROCESSTAP_COL]
+    for entry in context.taxonomyEntries:
+        tc1 = entry['TC1']
+        splittedTc2 = entry['TC2']
+        proces = entry['Proces']
+        processtap = entry['Processtap']
 
-        if tc1 in taxcoReport:
-            if taxcoReport[tc1]['TC2'][1] == '🏳️' or taxcoReport[tc1]['TC2'][2] == '🏳️':
-                splittedTc2 = tc2.split(',')
-                for index in range(1, 3):
-                    if taxcoReport[tc1]['TC2'][index] == '🏳️' and splittedTc2[index] != '🏳️':
-                        taxcoReport[tc1]['TC2'][index] = splittedTc2[index]
+        if (tc1,) in taxcoReport:
+            row = taxcoReport.rows[(tc1,)]
+            for index in range(1, 3):
+                if taxcoReport.isNotNecessary(row, 'TC2', index) and splittedTc2[index] != NOT_NECESSARY_ICON:
+                    taxcoReport.setCell(row, 'TC2', index, splittedTc2[index])
 
-        if tc1 not in taxcoReport: 
-            splittedTc2 = tc2.split(',')
-
-            taxcoReport[tc1] = {
-                "Proces" : proces,
-                "Processtap" : processtap,
-                'TC2': [NOT_NECESSARY_ICON if splittedTc2[0] == 'X' else 'x', NOT_NECESSARY_ICON if splittedTc2[1] == 'X' else 'x', NOT_NECESSARY_ICON if splittedTc2[2] == 'X' else 'x']        
-            }
+        else:
+            taxcoReport.addRow((tc1,), {'TC2': splittedTc2}, (proces, processtap))
 
 """
 Fills the Report 2 data with the data from the dataset.
 Every unique TC3 and TC1 combination will be added to the Report 2 data.
 """
-def populateContentReport():
-    global contentReport
-
-    for row in dataset[1:]:
-        tc1 = row[TC1_COL]
-        tc2 = row[TC2_COL]
-        tc3 = row[TC3_COL]
-        lt = row[LT_COL]
-        oi = row[OI_COL]
-        pi = row[PI_COL]
-        dt = row[DT_COL]
-
-        if tc3 not in contentReport:
-            contentReport[tc3] = {}
-
-        if tc1 not in contentReport[tc3]:
-            splittedTc2 = tc2.split(',')
-            splittedLT = lt.split(',')
-            splittedOI = oi.split(',')
-            splittedPI = pi.split(',')
-            splittedDT = dt.split(',')
-            
-            contentReport[tc3][tc1] = {
-                'TC2': [NOT_NECESSARY_ICON if splittedTc2[0] == 'X' else 'x', NOT_NECESSARY_ICON if splittedTc2[1] == 'X' else 'x', NOT_NECESSARY_ICON if splittedTc2[2] == 'X' else 'x'],
-                LT: [NOT_NECESSARY_ICON if splittedLT[0] == 'X' else 'x', NOT_NECESSARY_ICON if splittedLT[1] == 'X' else 'x', NOT_NECESSARY_ICON if splittedLT[2] == 'X' else 'x'],
-                OI: [NOT_NECESSARY_ICON if splittedOI[0] == 'X' else 'x', NOT_NECESSARY_ICON if splittedOI[1] == 'X' else 'x', NOT_NECESSARY_ICON if splittedOI[2] == 'X' else 'x'],
-                PI: [NOT_NECESSARY_ICON if splittedPI[0] == 'X' else 'x', NOT_NECESSARY_ICON if splittedPI[1] == 'X' else 'x', NOT_NECESSARY_ICON if splittedPI[2] == 'X' else 'x'],
-                DT: [NOT_NECESSARY_ICON if splittedDT[0] == 'X' else 'x', NOT_NECESSARY_ICON if splittedDT[1] == 'X' else 'x', NOT_NECESSARY_ICON if splittedDT[2] == 'X' else 'x'],
-            }  
- 
\ No newline at end of file
+def populateContentReport(context):
+    contentReport = context.contentReport
+
+    for entry in context.taxonomyEntries:
+        tc1 = entry['TC1']
+        tc3 = entry['TC3']
+
+        if (tc3, tc1) not in contentReport:
+            contentReport.addRow((tc3, tc1), {
+                'TC2': entry['TC2'],
+                LT: entry[LT],
+                OI: entry[OI],
+                PI: entry[PI],
+                DT: entry[DT],
+            })
@@ -0,0 +1,76 @@
+import sys, json
+from report.coverage import CATEGORIES
+
+RESULT_STREAM_VERSION = 1
+
+
+"""
+Machine-readable results of a compilation, written as NDJSON (one JSON record per line).
+A record is written as soon as the result is known, so a reader can follow the file while the compiler runs:
+    dataset   A row of the dataset with errors, after the dataset is parsed.
+    file      A parsed markdown file with its report list, taxonomie, tags, errors and found taxonomie codes.
+    image     An image that isn't used by any of the markdown files.
+    process   The coverage of a TC1 (taxco report), after all the files are parsed.
+    taxonomy  The coverage of a TC3 and TC1 combination (content report), after all the files are parsed.
+    summary   The totals of the compilation, always the last record.
+Every line is flushed when it's written.
+
+Args:
+    path (str): Path of the NDJSON file, '-' writes the records to stdout.
+"""
+class ResultStream:
+    def __init__(self, path):
+        self.path = path
+        self.file = sys.stdout if path == '-' else open(path, 'w', encoding='utf-8', buffering=1)
+        self.counts = {}
+        self.write({'type': 'start', 'version': RESULT_STREAM_VERSION})
+
+    def write(self, record):
+        self.counts[record['type']] = self.counts.get(record['type'], 0) + 1
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        if self.file is sys.stdout:
+            self.file.flush()
+
+    def writeDatasetRows(self, diagnostics):
+        for row in diagnostics:
+            self.write({'type': 'dataset', **row})
+
+    def writeFile(self, result):
+        self.write({
+            'type': 'file',
+            'report': result['reportList'],
+            **result['reportRow'],
+            'taxonomies': [list(taxonomie) for taxonomie in result['foundTaxonomies']],
+            'images': result['images'],
+        })
+
+    def writeImage(self, row):
+        self.write({'type': 'image', **row})
+
+    # The coverage of both reports, one record per row of the report tables
+    def writeCoverage(self, taxcoReport, contentReport):
+        for (tc1,), row in taxcoReport.iterRows():
+            proces, processtap = taxcoReport.labels[row]
+            self.write({'type': 'process', 'tc1': tc1, 'proces': proces, 'processtap': processtap, 'levels': taxcoReport.getStates(row, 'TC2')})
+
+        for (tc3, tc1), row in contentReport.iterRows():
+            self.write({'type': 'taxonomy', 'tc3': tc3, 'tc1': tc1, 'levels': {category: contentReport.getStates(row, category) for category in CATEGORIES}})
+
+    # The totals of the compilation, the counters of the metrics are included
+    def writeSummary(self, context, status, totalSeconds, error=None):
+        record = {
+            'type': 'summary',
+            'status': status,
+            'files': {name: len(context.getReportList(name)) for name in ['parsedFiles', 'failedFiles', 'WIPFiles', 'ignoredFiles']},
+            'unusedImages': len(context.failedImages),
+            'datasetErrors': len(context.datasetDiagnostics),
+            'records': dict(self.counts),
+            'metrics': context.metrics.toDict(totalSeconds),
+        }
+        if error:
+            record['error'] = error
+        self.write(record)
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
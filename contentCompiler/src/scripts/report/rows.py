@@ -0,0 +1,68 @@
+import json, heapq
+from operator import itemgetter
+
+REPORT_BATCH_SIZE = 5000
+
+
+"""
+Rows of a report table, which are kept sorted on a key when they are written to the report.
+The rows are kept in memory until a batch is full, then the batch is sorted and spilled to a
+temporary file. When the report is written the sorted batches are merged, so the memory use
+stays the same for any amount of files. Rows with the same key keep the order they were added in.
+
+Args:
+    sortKey (str): Key of the row the report table is sorted on.
+    batchSize (int): Amount of rows kept in memory before they are spilled to a temporary file.
+"""
+class ReportRows:
+    def __init__(self, sortKey, batchSize=REPORT_BATCH_SIZE):
+        self.sortKey = sortKey
+        self.batchSize = batchSize
+        self.rows = []
+        self.spilledBatches = []
+        self.count = 0
+
+    def append(self, row):
+        self.rows.append(row)
+        self.count += 1
+
+        if len(self.rows) >= self.batchSize:
+            self.spill()
+
+    # Sort the rows in memory and write them to a temporary file, one JSON row per line
+    def spill(self):
+        import tempfile
+
+        batch = tempfile.TemporaryFile('w+', encoding='utf-8')
+        for row in sorted(self.rows, key=itemgetter(self.sortKey)):
+            batch.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+        self.spilledBatches.append(batch)
+        self.rows = []
+
+    # All the rows sorted on the sort key, the spilled batches are merged while reading them
+    def sortedRows(self):
+        batches = [readBatch(batch) for batch in self.spilledBatches]
+        batches.append(sorted(self.rows, key=itemgetter(self.sortKey)))
+        return heapq.merge(*batches, key=itemgetter(self.sortKey))
+
+    # Remove all the rows and the temporary files
+    def clear(self):
+        for batch in self.spilledBatches:
+            batch.close()
+
+        self.rows = []
+        self.spilledBatches = []
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return iter(self.sortedRows())
+
+# Read the rows of a spilled batch from the start of the file
+def readBatch(batch):
+    batch.seek(0)
+    for line in batch:
+        yield json.loads(line)
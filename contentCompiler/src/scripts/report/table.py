@@ -1,37 +1,40 @@
-# Generate a markdown table string from a list of rows and headers.
-def generateMarkdownTable(headers, rows):
-    table = "| " + " | ".join(headers) + " |\n"
-    table += "| " + " | ".join(["---"] * len(headers)) + " |\n"
+# Write a markdown table to a file row by row, the rows can be any iterable (like a generator).
+def writeMarkdownTable(f, headers, rows):
+    f.write("| " + " | ".join(headers) + " |\n")
+    f.write("| " + " | ".join(["---"] * len(headers)) + " |\n")
 
     for row in rows:
-        table += "| " + " | ".join(row) + " |\n"
-    return table
+        f.write("| " + " | ".join(row) + " |\n")
 
 # Create a new row in the file report based on the status, file path, taxonomie, and tags.
+# The taxonomie, tags and errors are kept as lists, they are only joined when the table is written.
 def createFileReportRow(status, filePath, srcDir, taxonomie, tags, errors):
     return {
         "status": status,
         "file": filePath.stem,
         "path": str(filePath.relative_to(srcDir)),
-        "taxonomie": '<br>'.join(taxonomie) if taxonomie else "N/A",
-        "tags": '<br>'.join(tags) if tags else "N/A",
-        "errors": '<br>'.join(errors) if errors else "N/A"
+        "taxonomie": taxonomie,
+        "tags": tags,
+        "errors": errors
     }
 
-# Format the success or failed report table based on a list.
-def formatFileReportTable(fileReport):
+# Join the values of a table cell, an empty cell is written as N/A
+def formatCell(values):
+    return '<br>'.join(values) if values else "N/A"
+
+# Write the success or failed report table based on an iterable of file rows.
+def writeFileReportTable(f, fileReport):
     headers = ["Status", "File", "Path", "Taxonomie", "Tags", "Errors"]
-    rows = [[
+    rows = ([
         file['status'], 
         file['file'], 
         file['path'], 
-        file['taxonomie'], 
-        file['tags'],
-        file['errors']
-     ] for file in fileReport]
+        formatCell(file['taxonomie']),
+        formatCell(file['tags']),
+        formatCell(file['errors'])
+     ] for file in fileReport)
 
-    table = generateMarkdownTable(headers, rows)
-    return table
+    writeMarkdownTable(f, headers, rows)
 
 # Create a row for the image report table
 def createImageTableTow(status, filePath, srcDir, error):
@@ -42,15 +45,14 @@ def createImageTableTow(status, filePath, srcDir, error):
         "error": error,
     }
 
-# Format the image report table with specific headers and rows
-def formatImageReportTable(imageReport):
+# Write the image report table with specific headers and rows
+def writeImageReportTable(f, imageReport):
     headers = ["Status", "Image", "Path", "Error"]
-    rows = [[
+    rows = ([
         file['status'], 
         file['image'], 
         file['path'],
         file['error']
-    ] for file in imageReport]
+    ] for file in imageReport)
 
-    table = generateMarkdownTable(headers, rows)
-    return table
+    writeMarkdownTable(f, headers, rows)
\ No newline at end of file
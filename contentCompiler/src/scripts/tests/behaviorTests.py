@@ -0,0 +1,366 @@
+# Imports
+import os, json, errno, shutil, logging, tempfile
+from contextlib import contextmanager
+from pathlib import Path
+# Variables
+from config import SRC_DIR, DEST_DIR, DATASET, TC3_COL, TAXCO_REPORT_PATH, CONTENT_REPORT_PATH, DATASET_REPORT_PATH, IMAGE_PUBLISH_MODES, ERROR_INVALID_DYNAMIC_LINK
+# Functions
+from compileContent import ContentCompiler
+from tests.benchmark import ContentGenerator, BenchmarkRunner
+import files.parse, files.mappedFile, files.publish
+from report.resultStream import RESULT_STREAM_VERSION
+
+TESTS_DIR = Path(__file__).resolve().parents[0]
+
+
+"""
+Behavior tests of the compile modes that work on the build folder of a previous compile.
+Every test creates a checkout in a temporary folder, with the test cases as content and the test dataset,
+and compiles it more than once with ContentCompiler, the same way compileContent.py does.
+"""
+
+# Create a checkout in the given folder, with the test cases as content folder and the test dataset
+def createCheckout(rootDir):
+    shutil.copytree(TESTS_DIR / 'test_cases', rootDir / SRC_DIR)
+    os.makedirs(rootDir / os.path.dirname(DATASET))
+    shutil.copy(TESTS_DIR / 'test_dataset.xlsx', rootDir / DATASET)
+
+# Write a markdown file with an empty header to the content folder of the checkout
+def writeContentFile(rootDir, fileName, body):
+    with open(rootDir / SRC_DIR / fileName, 'w', encoding='utf-8') as f:
+        f.write(f"---\n---\n\n{body}\n")
+
+# Compile the checkout, returns the context of the compile
+def compileCheckout(rootDir, **options):
+    compiler = ContentCompiler(root=str(rootDir), **options)
+    compiler.compile()
+    return compiler.context
+
+# The rows of all the report lists, by the path of the file relative to the content folder
+def getReportedFiles(context):
+    reportedFiles = {}
+    for name in ['parsedFiles', 'failedFiles', 'WIPFiles', 'ignoredFiles']:
+        for row in context.getReportList(name).sortedRows():
+            reportedFiles[row['path']] = row
+    return reportedFiles
+
+# Checks if one of the errors of a reported file starts with the given error
+def hasError(context, path, error):
+    row = getReportedFiles(context).get(path)
+    return row is not None and any(fileError.startswith(error) for fileError in row['errors'])
+
+# The content of the build folder and the reports, by the path of the file relative to the checkout
+def readCompileOutput(rootDir):
+    output = {}
+    for dirPath, _, fileNames in os.walk(rootDir / DEST_DIR):
+        for fileName in fileNames:
+            filePath = Path(dirPath) / fileName
+            output[filePath.relative_to(rootDir).as_posix()] = filePath.read_bytes()
+    for reportPath in [TAXCO_REPORT_PATH, CONTENT_REPORT_PATH, DATASET_REPORT_PATH]:
+        output[reportPath] = (rootDir / reportPath).read_bytes()
+    return output
+
+# Replace attributes of a module (like a size limit) while a test compiles, the attributes are restored afterwards
+@contextmanager
+def replacedAttributes(module, **attributes):
+    originalAttributes = {name: getattr(module, name) for name in attributes}
+    for name, value in attributes.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in originalAttributes.items():
+            setattr(module, name, value)
+
+# The paths of the files of which the content differs between two outputs of readCompileOutput
+def getDifferentFiles(expectedOutput, output):
+    return sorted(path for path in expectedOutput.keys() | output.keys() if expectedOutput.get(path) != output.get(path))
+
+# Log a failed check of a test, returns if the check passed
+def check(testName, passed, message):
+    if not passed:
+        logging.error(f"{testName}: {message}")
+    return passed
+
+"""
+An incremental compile after the target of a dynamic link is deleted.
+The file with the link didn't change, but it has to be compiled again because its link target is gone,
+and the output of the deleted file has to be removed from the build folder.
+"""
+def testIncrementalDeletedLinkTarget(rootDir):
+    testName = "Incremental compile after a deleted link target"
+    writeContentFile(rootDir, 'Linkbron.md', "[[Linkdoel]]")
+    writeContentFile(rootDir, 'Linkdoel.md', "Doel van de link")
+
+    context = compileCheckout(rootDir, incremental=True)
+    if not check(testName, not hasError(context, 'Linkbron.md', ERROR_INVALID_DYNAMIC_LINK), "the link is reported before the target is deleted"):
+        return False
+
+    os.remove(rootDir / SRC_DIR / 'Linkdoel.md')
+    context = compileCheckout(rootDir, incremental=True)
+
+    return (
+        check(testName, hasError(context, 'Linkbron.md', ERROR_INVALID_DYNAMIC_LINK), "the link to the deleted file isn't reported")
+        and check(testName, not (rootDir / DEST_DIR / 'Linkdoel.md').exists(), "the output of the deleted file is still in the build folder")
+    )
+
+"""
+A changed-files compile with a list of paths, relative to the content repository like the output of git diff.
+Only the changed file and the file that links to it are compiled, the other output of the previous build is kept.
+"""
+def testChangedFilesPathList(rootDir):
+    testName = "Changed files compile with a list of paths"
+    changedFile = '26. work-in-progress test.md'
+    writeContentFile(rootDir, 'Linkbron.md', "[[26. work-in-progress test]]")
+
+    compileCheckout(rootDir)
+    context = compileCheckout(rootDir, changedFiles=[f"{os.path.basename(SRC_DIR)}/{changedFile}"])
+
+    reportedFiles = getReportedFiles(context)
+    return (
+        check(testName, set(reportedFiles) == {changedFile, 'Linkbron.md'}, f"the compiled files are {sorted(reportedFiles)}")
+        and check(testName, (rootDir / DEST_DIR / '1. Correct taxonomie codes.md').exists(), "the output of an unchanged file is removed from the build folder")
+    )
+
+"""
+A changed-files compile with a single path that contains '..' but doesn't exist, like a mistyped path.
+It isn't a valid git range, so it is used as a path outside the content folder and no file is compiled.
+"""
+def testChangedFilesMistypedPath(rootDir):
+    testName = "Changed files compile with a mistyped path"
+    try:
+        context = compileCheckout(rootDir, changedFiles=[f"../{os.path.basename(SRC_DIR)}/Bestaat niet.md"])
+    except ValueError as e:
+        return check(testName, False, f"the path is used as a git range: {str(e)}")
+
+    reportedFiles = getReportedFiles(context)
+    return check(testName, not reportedFiles, f"the compiled files are {sorted(reportedFiles)}")
+
+"""
+A compile of a checkout that already has a build folder.
+The files that aren't part of the build anymore (the output of a deleted file and files that never were part of
+the build) are removed, together with the folders that are empty afterwards. Unchanged files aren't written again.
+"""
+def testStaleOutputRemoval(rootDir):
+    testName = "Removal of stale build output"
+    destDir = rootDir / DEST_DIR
+    deletedFile = '2. Taxonomie code op negatief niveau.md'
+    unchangedFile = destDir / '1. Correct taxonomie codes.md'
+
+    compileCheckout(rootDir)
+    os.remove(rootDir / SRC_DIR / deletedFile)
+    (destDir / 'oud.md').write_text("oud", encoding='utf-8')
+    (destDir / 'oud').mkdir()
+    (destDir / 'oud' / 'afbeelding.png').write_bytes(b'oud')
+    unchangedTime = os.stat(unchangedFile).st_mtime_ns
+
+    context = compileCheckout(rootDir)
+
+    return (
+        check(testName, not (destDir / deletedFile).exists(), "the output of the deleted file is still in the build folder")
+        and check(testName, not (destDir / 'oud.md').exists() and not (destDir / 'oud').exists(), "the stale files or folder are still in the build folder")
+        and check(testName, context.metrics.counters.get('staleFilesRemoved') == 3, f"{context.metrics.counters.get('staleFilesRemoved')} stale files removed instead of 3")
+        and check(testName, os.stat(unchangedFile).st_mtime_ns == unchangedTime, "an unchanged file is written again")
+    )
+
+"""
+A compile with worker processes and a compile as a pipeline give the same reports and build output as a serial compile,
+byte for byte. Every compile starts without a build folder, so every file is written.
+"""
+def testParseModesIdenticalOutput(rootDir):
+    testName = "Identical output of the parse modes"
+    compileCheckout(rootDir)
+    expectedOutput = readCompileOutput(rootDir)
+    passed = True
+
+    for mode, options in [('jobs=2', {'jobs': 2}), ('pipeline', {'pipeline': True})]:
+        shutil.rmtree(rootDir / DEST_DIR)
+        compileCheckout(rootDir, **options)
+        output = readCompileOutput(rootDir)
+        differentFiles = getDifferentFiles(expectedOutput, output)
+        passed = check(testName, not differentFiles, f"{mode} differs from jobs=1 in {differentFiles}") and passed
+
+    return passed
+
+"""
+A compile where every markdown file with a header is memory-mapped (files/mappedFile.py) gives the same output as
+a compile that reads the files. The body is written in chunks of a few bytes, so links and multi-byte characters
+are split over chunks.
+"""
+def testMappedFilesIdenticalOutput(rootDir):
+    testName = "Identical output of memory-mapped files"
+    writeContentFile(rootDir, 'Lange regels é.md', "[[Linkdoel]] één -=TODO=- ![[test_image_3.png]] " * 20)
+    writeContentFile(rootDir, 'Linkdoel.md', "Doel van de link")
+    compileCheckout(rootDir)
+    expectedOutput = readCompileOutput(rootDir)
+
+    shutil.rmtree(rootDir / DEST_DIR)
+    with replacedAttributes(files.parse, MAPPED_FILE_SIZE=0), replacedAttributes(files.mappedFile, MAPPED_CHUNK_SIZE=7):
+        context = compileCheckout(rootDir)
+    differentFiles = getDifferentFiles(expectedOutput, readCompileOutput(rootDir))
+
+    filesMapped = context.metrics.counters.get('filesMapped', 0)
+    return (
+        check(testName, filesMapped > 0, "no file is memory-mapped")
+        and check(testName, not differentFiles, f"the mapped files differ from the read files in {differentFiles}")
+    )
+
+"""
+Every image publish mode gives the same images in the build folder. A hardlinked image is the same file as the
+source image, and when a hardlink isn't possible (like a build folder on another filesystem) the image is copied.
+A reflink is only possible on a copy-on-write filesystem, on other filesystems the images are copied as well.
+"""
+def testImagePublishModes(rootDir):
+    testName = "Image publish modes"
+    compileCheckout(rootDir)
+    expectedOutput = readCompileOutput(rootDir)
+    passed = True
+
+    # os.link fails like it does across filesystems, so the hardlink mode falls back to a copy
+    def failingLink(sourcePath, destPath):
+        raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+
+    for mode, linkFunction in [(mode, os.link) for mode in IMAGE_PUBLISH_MODES] + [('hardlink', failingLink)]:
+        shutil.rmtree(rootDir / DEST_DIR)
+        with replacedAttributes(files.publish.os, link=linkFunction):
+            context = compileCheckout(rootDir, imageMode=mode)
+        description = f"{mode} without hardlinks" if linkFunction is failingLink else mode
+
+        differentFiles = getDifferentFiles(expectedOutput, readCompileOutput(rootDir))
+        passed = check(testName, not differentFiles, f"{description} differs from copy in {differentFiles}") and passed
+
+        counters = context.metrics.counters
+        imagesCopied, imagesLinked = counters.get('imagesCopied', 0), counters.get('imagesLinked', 0)
+        if mode == 'copy' or linkFunction is failingLink:
+            passed = check(testName, imagesCopied > 0 and imagesLinked == 0, f"{description}: {imagesCopied} images copied, {imagesLinked} linked") and passed
+        elif mode == 'hardlink':
+            imagePaths = [path for path in (rootDir / DEST_DIR).rglob('*') if path.is_file() and path.suffix != '.md']
+            isLinked = imagePaths and all(os.path.samefile(path, rootDir / SRC_DIR / path.relative_to(rootDir / DEST_DIR)) for path in imagePaths)
+            passed = check(testName, imagesLinked > 0 and imagesCopied == 0 and isLinked, f"{description}: {imagesCopied} images copied, {imagesLinked} linked") and passed
+        else:
+            passed = check(testName, imagesCopied + imagesLinked > 0, f"{description}: no image published") and passed
+
+    return passed
+
+"""
+A compile that streams its results to an NDJSON file (report/resultStream.py), serial and with worker processes.
+Every line is a JSON record, the stream starts with a start record and ends with the summary, and there is a
+record for every compiled file (with the same report list and errors as the report), dataset error, unused image
+and row of the coverage reports.
+"""
+def testResultStream(rootDir):
+    testName = "Result stream"
+    passed = True
+
+    for mode, options in [('jobs=1', {}), ('jobs=2', {'jobs': 2})]:
+        resultsPath = rootDir / 'results.ndjson'
+        context = compileCheckout(rootDir, resultsPath=str(resultsPath), **options)
+        try:
+            with open(resultsPath, 'r', encoding='utf-8') as f:
+                records = [json.loads(line) for line in f]
+        except ValueError as e:
+            passed = check(testName, False, f"{mode}: a line isn't valid JSON: {str(e)}") and passed
+            continue
+
+        recordTypes = [record['type'] for record in records]
+        counts = {recordType: recordTypes.count(recordType) for recordType in set(recordTypes)}
+        fileRecords = {record['path']: record for record in records if record['type'] == 'file'}
+        streamedFiles = {path: (record['report'], record['errors']) for path, record in fileRecords.items()}
+        reportedFiles = {}
+        for listName in ['parsedFiles', 'failedFiles', 'WIPFiles', 'ignoredFiles']:
+            for row in context.getReportList(listName).sortedRows():
+                reportedFiles[row['path']] = (listName, row['errors'])
+        expectedCounts = {
+            'dataset': len(context.datasetDiagnostics),
+            'image': len(context.failedImages),
+            'process': len(list(context.taxcoReport.iterRows())),
+            'taxonomy': len(list(context.contentReport.iterRows())),
+        }
+        summary = records[-1]
+
+        passed = (
+            check(testName, records[0] == {'type': 'start', 'version': RESULT_STREAM_VERSION}, f"{mode}: the first record is {records[0]}")
+            and check(testName, recordTypes.count('summary') == 1 and summary['type'] == 'summary' and summary['status'] == 'success', f"{mode}: the summary isn't the last record or the compile failed")
+            and check(testName, counts.get('file') == len(fileRecords) == len(reportedFiles), f"{mode}: {counts.get('file')} file records for {len(reportedFiles)} reported files")
+            and check(testName, streamedFiles == reportedFiles, f"{mode}: the file records differ from the report in {sorted(path for path in streamedFiles.keys() | reportedFiles.keys() if streamedFiles.get(path) != reportedFiles.get(path))}")
+            and check(testName, all(counts.get(recordType, 0) == count for recordType, count in expectedCounts.items()), f"{mode}: the records {counts} don't match {expectedCounts}")
+            and check(testName, summary['records'] == {recordType: count for recordType, count in counts.items() if recordType != 'summary'}, f"{mode}: the summary counts {summary['records']} records")
+        ) and passed
+
+    return passed
+
+"""
+A compile with a dataset that has errors (tests/test_dataset_errors.xlsx): a row with an empty required column and a
+row with too few levels are removed, a row with an invalid level and a duplicate TC1 and TC3 combination are kept.
+The dataset report has to be the same as tests/reports/expected_dataset_test_report.md.
+"""
+def testDatasetReport(rootDir):
+    testName = "Dataset report"
+    shutil.copy(TESTS_DIR / 'test_dataset_errors.xlsx', rootDir / DATASET)
+    context = compileCheckout(rootDir)
+
+    expectedReport = (TESTS_DIR / 'reports' / 'expected_dataset_test_report.md').read_text(encoding='utf-8')
+    report = (rootDir / DATASET_REPORT_PATH).read_text(encoding='utf-8')
+    datasetTopics = [row[TC3_COL] for row in context.dataset[1:]]
+    return (
+        check(testName, report == expectedReport, f"the dataset report differs from the expected report:\n{report}")
+        and check(testName, 'Zonder-Proces' not in datasetTopics and 'Te-Weinig-Niveaus' not in datasetTopics, "a removed row is used in the dataset")
+        and check(testName, 'Ongeldig-Niveau' in datasetTopics, "a row with an invalid level is removed from the dataset")
+    )
+
+"""
+A small run of the benchmark (tests/benchmark.py) in every parse mode: serial, with worker processes and as a pipeline.
+The benchmark calls the compile functions itself, so this catches a signature change the benchmark wasn't updated for.
+"""
+def testBenchmarkSmokeRun(rootDir):
+    testName = "Benchmark smoke run"
+    passed = True
+
+    for jobs, pipeline in [(1, False), (2, False), (1, True)]:
+        generator = ContentGenerator(rootDir / 'benchmark', 20, 3, 10, 10, 2, 1)
+        generator.generate()
+        results = BenchmarkRunner(generator, jobs, False, pipeline).run()
+        filesParsed = results['metrics']['counters'].get('filesParsed')
+        passed = check(testName, filesParsed == 20, f"{filesParsed} files parsed instead of 20 with jobs={jobs}, pipeline={pipeline}") and passed
+
+    return passed
+
+"""
+Two compiles with --link-cache and worker processes.
+The links resolved by the workers are sent back to the main process and saved, so the second compile finds every
+dynamic link in the cache loaded from .cache/links.
+"""
+def testLinkCacheWorkerMerge(rootDir):
+    testName = "Link cache with worker processes"
+    writeContentFile(rootDir, 'Linkbron.md', "[[Linkdoel]] [[Linkdoel]] [[Ontbreekt]]")
+    writeContentFile(rootDir, 'Linkdoel.md', "Doel van de link")
+
+    context = compileCheckout(rootDir, jobs=2, linkCache=True)
+    firstMisses = context.metrics.counters.get('linkCacheMisses', 0)
+    if not check(testName, firstMisses > 0, "no link is resolved in the first compile"):
+        return False
+
+    context = compileCheckout(rootDir, jobs=2, linkCache=True)
+    hits = context.metrics.counters.get('linkCacheHits', 0)
+    misses = context.metrics.counters.get('linkCacheMisses', 0)
+    return (
+        check(testName, misses == 0, f"{misses} links missed the saved cache in the second compile")
+        and check(testName, hits >= firstMisses, f"{hits} cache hits in the second compile, the first compile resolved {firstMisses} links")
+        and check(testName, hasError(context, 'Linkbron.md', ERROR_INVALID_DYNAMIC_LINK), "a cached missing link isn't reported")
+    )
+
+# Run a test in a new checkout, the checkout is removed afterwards
+def runBehaviorTest(test):
+    rootDir = Path(tempfile.mkdtemp())
+    try:
+        createCheckout(rootDir)
+        return test(rootDir)
+    finally:
+        shutil.rmtree(rootDir)
+
+# Run all the behavior tests, also when one of them fails. Returns if all the tests passed
+def runBehaviorTests():
+    results = [runBehaviorTest(test) for test in BEHAVIOR_TESTS]
+    return all(results)
+
+BEHAVIOR_TESTS = [testIncrementalDeletedLinkTarget, testChangedFilesPathList, testChangedFilesMistypedPath, testStaleOutputRemoval, testLinkCacheWorkerMerge, testParseModesIdenticalOutput, testMappedFilesIdenticalOutput, testImagePublishModes, testResultStream, testDatasetReport, testBenchmarkSmokeRun]
@@ -0,0 +1,211 @@
+# Imports
+from pathlib import Path
+import os, sys, json, time, random, shutil, logging, argparse, tempfile, tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Variables and functions
+from context import CompileContext
+from files.images import fillFailedImages
+from report.generateTaxcoReport import generateTaxcoReport
+from report.generateContentReport import generateContentReport
+from files.parse import parseMarkdownFiles
+from files.dataset import parseDatasetFile
+from report.populate import populateTaxcoReport, populateContentReport
+
+DATASET_HEADERS = ["Id", "TC-1", "TC-2", "Proces", "Processtap", "Onderwerp", "PS", "LT", "OI", "PI", "DT", "Auteur"]
+COMPONENTS = ["LT", "OI", "PI", "DT"]
+LEVELS = ["1,2,3", "X,2,3", "1,X,X", "X,2,X", "1,2,X"]
+# Smallest valid PNG file, used for every synthetic image
+PNG_IMAGE = bytes.fromhex("89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+                          "1f15c4890000000d49444154789c6360000002000100e221bc330000000049454e44ae426082")
+
+
+"""
+Generates a synthetic content repository with a matching dataset.
+Every markdown file gets taxonomie codes from the dataset, dynamic links to other files (and
+some broken links) and image embeds. Part of the images is never used, so the image audit has work too.
+
+Args:
+    rootDir (Path): Folder where the content folder and the dataset are generated.
+    files (int): Amount of markdown files.
+    linksPerFile (int): Amount of dynamic links in every file.
+    images (int): Amount of images.
+    taxonomies (int): Amount of rows in the dataset.
+    depth (int): Depth of the folder structure.
+    seed (int): Seed of the random generator, the same seed generates the same repository.
+"""
+class ContentGenerator:
+    def __init__(self, rootDir, files, linksPerFile, images, taxonomies, depth, seed):
+        self.rootDir = Path(rootDir)
+        self.contentDir = self.rootDir / 'content'
+        self.datasetPath = self.rootDir / 'dataset.xlsx'
+        self.files = files
+        self.linksPerFile = linksPerFile
+        self.images = images
+        self.taxonomies = taxonomies
+        self.depth = depth
+        self.random = random.Random(seed)
+        self.datasetRows = []
+
+    def generate(self) -> None:
+        if self.rootDir.exists():
+            shutil.rmtree(self.rootDir)
+        self.contentDir.mkdir(parents=True)
+
+        self.generateDataset()
+        folders = self.generateFolders()
+        self.generateImages(folders)
+        self.generateMarkdownFiles(folders)
+
+    def generateDataset(self) -> None:
+        from openpyxl import Workbook
+
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(DATASET_HEADERS)
+
+        for index in range(self.taxonomies):
+            tc1 = f"{chr(97 + index % 26)}{chr(97 + index // 26 % 26)}-{index % 1000}"
+            tc3 = f"Onderwerp-{index}"
+            levels = self.random.choice(LEVELS)
+            self.datasetRows.append((tc1, tc3, levels))
+            sheet.append([index, tc1, levels, f"Proces-{index % 10}", f"Processtap-{index % 50}", tc3, None, levels, levels, levels, levels, None])
+
+        workbook.save(self.datasetPath)
+
+    # Every folder gets a 'src' folder for the images, like the real content repository
+    def generateFolders(self) -> list:
+        folders = [self.contentDir]
+        for level in range(self.depth):
+            parent = folders[-1]
+            folders.extend(parent / f"map-{level}-{index}" for index in range(3))
+
+        for folder in folders:
+            (folder / 'src').mkdir(parents=True, exist_ok=True)
+        return folders
+
+    def generateImages(self, folders) -> None:
+        self.imageNames = []
+        for index in range(self.images):
+            imageName = f"{self.random.choice(COMPONENTS)}_image_{index}.png"
+            (self.random.choice(folders) / 'src' / imageName).write_bytes(PNG_IMAGE)
+            self.imageNames.append(imageName)
+
+    def generateMarkdownFiles(self, folders) -> None:
+        fileNames = [f"bestand-{index}" for index in range(self.files)]
+        # Only three quarters of the images are used
+        usedImages = self.imageNames[:max(1, len(self.imageNames) * 3 // 4)] if self.imageNames else []
+
+        for fileName in fileNames:
+            tc1, tc3, levels = self.random.choice(self.datasetRows)
+            level = self.random.choice([level for level in levels.split(',') if level != 'X'] or ['1'])
+            taxonomie = f"{tc1}.{level}.{tc3}.{self.random.choice(COMPONENTS)}"
+
+            links = [f"[[{self.random.choice(fileNames)}]]" for _ in range(self.linksPerFile)]
+            if self.random.random() < 0.05:
+                links.append(f"[[content/niet-bestaand-{fileName}]]")
+            images = [f"![[{self.random.choice(usedImages)}]]" for _ in range(2)] if usedImages else []
+
+            content = (
+                f"---\ntitle: {fileName}\ntaxonomie:\n  - {taxonomie}\ntags:\n  - benchmark\n---\n\n"
+                f"# {fileName}\n\n" +
+                "Lorem ipsum dolor sit amet, consectetur adipiscing elit.\n" * 20 +
+                '\n'.join(links) + '\n\n' + '\n'.join(images) + '\n'
+            )
+            (self.random.choice(folders) / f"{fileName}.md").write_text(content, encoding='utf-8')
+
+class BenchmarkRunner:
+    def __init__(self, generator: ContentGenerator, jobs: int, measureMemory: bool, pipeline: bool = False):
+        self.generator = generator
+        self.jobs = jobs
+        self.pipeline = pipeline
+        self.measureMemory = measureMemory
+        self.context = CompileContext()
+        self.results = {}
+
+    # Run a stage and record the time and (optionally) the peak memory of the stage
+    def runStage(self, name, function, *args) -> None:
+        if self.measureMemory:
+            tracemalloc.start()
+
+        startTime = time.perf_counter()
+        function(*args)
+        elapsedTime = time.perf_counter() - startTime
+
+        peakMemory = None
+        if self.measureMemory:
+            peakMemory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        self.results[name] = {
+            'seconds': round(elapsedTime, 6),
+            'filesPerSecond': round(self.generator.files / elapsedTime, 1) if elapsedTime > 0 else None,
+            'peakMemoryBytes': peakMemory,
+        }
+
+    def run(self) -> dict:
+        rootDir = self.generator.rootDir
+        destDir = rootDir / 'build'
+        context = self.context
+
+        # The dataset cache is a new temporary folder, so the dataset load always parses the XLSX file
+        with tempfile.TemporaryDirectory() as datasetCacheDir:
+            self.runStage('datasetLoad', parseDatasetFile, context, self.generator.datasetPath, datasetCacheDir)
+        self.runStage('reportPopulate', lambda: (populateTaxcoReport(context), populateContentReport(context)))
+        self.runStage('parse', lambda: parseMarkdownFiles(context, self.generator.contentDir, destDir, False, jobs=self.jobs, manifest=None, imageMode='copy', pipeline=self.pipeline))
+        self.runStage('imageAudit', fillFailedImages, context, self.generator.contentDir)
+        self.runStage('reportGeneration', lambda: (generateTaxcoReport(context, rootDir / 'taxco_report.md'), generateContentReport(context, rootDir / 'content_report.md')))
+
+        return {
+            'config': {
+                'files': self.generator.files,
+                'linksPerFile': self.generator.linksPerFile,
+                'images': self.generator.images,
+                'taxonomies': self.generator.taxonomies,
+                'depth': self.generator.depth,
+                'jobs': self.jobs,
+                'pipeline': self.pipeline,
+            },
+            'stages': self.results,
+            'metrics': context.metrics.toDict(sum(stage['seconds'] for stage in self.results.values())),
+        }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the content compiler on a synthetic content repository.")
+    parser.add_argument('--files', type=int, default=1000, help='Amount of markdown files.')
+    parser.add_argument('--links', type=int, default=5, help='Amount of dynamic links per file.')
+    parser.add_argument('--images', type=int, default=200, help='Amount of images.')
+    parser.add_argument('--taxonomies', type=int, default=100, help='Amount of rows in the synthetic dataset.')
+    parser.add_argument('--depth', type=int, default=3, help='Depth of the folder structure.')
+    parser.add_argument('--seed', type=int, default=1, help='Seed of the random generator.')
+    parser.add_argument('--jobs', type=int, default=1, help='Amount of processes used to parse the markdown files.')
+    parser.add_argument('--pipeline', action='store_true', help='Read, parse and write the markdown files at the same time.')
+    parser.add_argument('--skip-memory', action='store_true', help="Don't measure the peak memory, tracemalloc slows down the stages.")
+    parser.add_argument('--workdir', help='Folder for the generated repository, a temporary folder is used when not given.')
+    parser.add_argument('--output', help='Write the results to this JSON file.')
+    args = parser.parse_args()
+
+    # The warnings for the generated broken links and unused images would dominate the run time
+    logging.basicConfig(level=logging.ERROR)
+
+    workDir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix='content-benchmark-'))
+    try:
+        generator = ContentGenerator(workDir, args.files, args.links, args.images, args.taxonomies, args.depth, args.seed)
+        generator.generate()
+
+        results = BenchmarkRunner(generator, args.jobs, not args.skip_memory, args.pipeline).run()
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workDir, ignore_errors=True)
+
+    for name, stage in results['stages'].items():
+        memory = f"{stage['peakMemoryBytes'] / 1024 / 1024:8.2f} MiB" if stage['peakMemoryBytes'] is not None else "       - MiB"
+        print(f"{name:<20} {stage['seconds']:10.4f} s {memory}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
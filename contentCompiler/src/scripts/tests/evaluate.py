@@ -4,7 +4,10 @@ from pathlib import Path
 # Variables
 from config import VERBOSE
 # Functions
+from context import CompileContext
 from files.parse import parseMarkdownFiles
+from files.dataset import parseDatasetFile
+from report.populate import populateTaxcoReport, populateContentReport
 
 markdownCountCheck = False  
 
@@ -14,15 +17,20 @@ def checkMarkdownFilesCount(folderPath):
     return len(list(folderPath.glob("*.md")))
 
 # Evaluate the tests by using check_markdown_files_count and removing the build folder afterwards
-def evaluateTests():
-    srcDir = Path(__file__).resolve().parents[2] / 'content'
-    destDir = Path(__file__).resolve().parents[2] / 'temp_build'
+# The files are compiled with a new context (with the dataset loaded), like runTests.py does.
+# The parsed dataset is cached in datasetCacheDir
+def evaluateTests(srcDir, datasetPath, datasetCacheDir):
+    destDir = Path(__file__).resolve().parents[0] / 'temp_build'
     startTime = time.time()
     if os.path.exists(destDir):
         shutil.rmtree(destDir)
-        os.mkdir(destDir)
-        
-    parseMarkdownFiles(srcDir, destDir, True)
+    os.mkdir(destDir)
+
+    context = CompileContext()
+    parseDatasetFile(context, datasetPath, datasetCacheDir)
+    populateTaxcoReport(context)
+    populateContentReport(context)
+    parseMarkdownFiles(context, srcDir, destDir, True)
 
     markdownCountCheck = checkMarkdownFilesCount(srcDir) == checkMarkdownFilesCount(destDir)
 
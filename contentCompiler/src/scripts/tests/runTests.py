@@ -1,23 +1,25 @@
 # Imports
 from pathlib import Path
-import shutil, os, sys, logging
+import shutil, os, sys, logging, tempfile
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Variables and functions
-from config import failedFiles
+from context import CompileContext
 from files.images import fillFailedImages
 from report.generateTaxcoReport import generateTaxcoReport
 from report.generateContentReport import generateContentReport
 from files.parse import parseMarkdownFiles
 from files.dataset import parseDatasetFile
 from tests.evaluate import evaluateTests
+from tests.behaviorTests import runBehaviorTests
 from report.populate import populateTaxcoReport, populateContentReport
 
 class TestRunner:
     def __init__(self):
         self.setupPaths()
         self.setupLogging()
+        self.context = CompileContext()
 
     @staticmethod
     def setupLogging() -> None:
@@ -30,6 +32,8 @@ class TestRunner:
         self.SRC_DIR = Path(__file__).resolve().parents[0] / 'test_cases'
         self.DEST_DIR = Path(__file__).resolve().parents[0] / 'test_cases_build'
         self.DATASET = Path(__file__).resolve().parents[0] / 'test_dataset.xlsx'
+        # The parsed dataset is cached in a temporary folder, which is removed when the tests are done
+        self.DATASET_CACHE_DIR = Path(tempfile.mkdtemp())
         self.TAXCO_REPORT_PATH = Path(__file__).resolve().parents[0] / 'reports/actual_taxco_test_report.md'
         self.CONTENT_REPORT_PATH = Path(__file__).resolve().parents[0] / 'reports/actual_content_test_report.md'
         self.EXPECTED_TAXCO_TEST_REPORT_PATH = 'tests/reports/expected_taxco_test_report.md'
@@ -48,6 +52,7 @@ class TestRunner:
         return expectedTestReportContent == actualTestReportContent
 
     def validateDraft(self) -> bool:
+        failedFiles = self.context.failedFiles
         expectedAmountOfDraftFiles = len(failedFiles)
         actualAmountOfDraftFiles = 0
         
@@ -85,23 +90,31 @@ class TestRunner:
             
             logging.info("Starting test execution...")
             
-            parseDatasetFile(self.DATASET)
+            parseDatasetFile(self.context, self.DATASET, self.DATASET_CACHE_DIR)
             logging.info("Dataset parsed successfully")
             
-            populateTaxcoReport()
-            populateContentReport()
+            populateTaxcoReport(self.context)
+            populateContentReport(self.context)
             logging.info("Reports populated")
             
-            parseMarkdownFiles(self.SRC_DIR, self.DEST_DIR, False)
+            parseMarkdownFiles(self.context, self.SRC_DIR, self.DEST_DIR, False)
             logging.info("Markdown files parsed")
             
-            fillFailedImages(self.SRC_DIR, self.DEST_DIR)
+            fillFailedImages(self.context, self.SRC_DIR)
             logging.info("Failed images processed")
             
-            generateTaxcoReport(self.TAXCO_REPORT_PATH)
-            generateContentReport(self.CONTENT_REPORT_PATH)
+            generateTaxcoReport(self.context, self.TAXCO_REPORT_PATH)
+            generateContentReport(self.context, self.CONTENT_REPORT_PATH)
             logging.info("Reports generated")
 
+            if not evaluateTests(self.SRC_DIR, self.DATASET, self.DATASET_CACHE_DIR):
+                logging.error("Test evaluation failed")
+                sys.exit(13)
+
+            if not runBehaviorTests():
+                logging.error("Behavior tests failed")
+                sys.exit(15)
+
             if not self.validateTestReport(self.EXPECTED_TAXCO_TEST_REPORT_PATH, self.ACTUAL_TAXCO_TEST_REPORT_PATH):
                 logging.error("Taxco Test report validation failed")
                 sys.exit(11)
@@ -110,10 +123,6 @@ class TestRunner:
                 logging.error("Content Test report validation failed")
                 sys.exit(12)
 
-            if not evaluateTests():
-                logging.error("Test evaluation failed")
-                sys.exit(13)
-
             if not self.validateDraft():
                 logging.error("Draft test failed")
                 sys.exit(14)
@@ -124,6 +133,8 @@ class TestRunner:
         except Exception as e:
             logging.error(f"Error during test execution: {str(e)}")
             raise
+        finally:
+            shutil.rmtree(self.DATASET_CACHE_DIR, ignore_errors=True)
 
 def main() -> None:
     try:
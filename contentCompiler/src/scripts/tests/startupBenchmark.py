@@ -0,0 +1,76 @@
+# Imports
+import os, sys, json, time, argparse, statistics, subprocess
+
+SCRIPTS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Modules a compile imports, besides the modules compileContent.py imports when it starts
+COMPILE_MODULES = [
+    'files.dataset', 'files.parse', 'files.images', 'report.populate',
+    'report.generateTaxcoReport', 'report.generateContentReport', 'report.generateDatasetReport',
+]
+
+# The commands that are measured, every command runs in a new interpreter
+COMMANDS = {
+    'interpreter': ['-c', 'pass'],
+    'help': ['compileContent.py', '--help'],
+    'import': ['-c', 'import compileContent'],
+    'compileImports': ['-c', 'import compileContent, ' + ', '.join(COMPILE_MODULES)],
+}
+
+
+# Start a command the given amount of times, returns the minimum and median wall time
+def measureCommand(arguments, runs):
+    times = []
+    for _ in range(runs):
+        startTime = time.perf_counter()
+        subprocess.run([sys.executable] + arguments, cwd=SCRIPTS_DIR, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - startTime)
+
+    return {'minSeconds': min(times), 'medianSeconds': statistics.median(times)}
+
+# The slowest imports of a compile, measured with python -X importtime (cumulative time in microseconds)
+def getSlowestImports(amount):
+    output = subprocess.run([sys.executable, '-X', 'importtime'] + COMMANDS['compileImports'], cwd=SCRIPTS_DIR, check=True, capture_output=True, text=True).stderr
+
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        selfTime, cumulativeTime, module = line[len('import time:'):].split('|')
+        imports.append({'module': module.strip(), 'cumulativeMicroseconds': int(cumulativeTime)})
+
+    return sorted(imports, key=lambda entry: entry['cumulativeMicroseconds'], reverse=True)[:amount]
+
+"""
+Measures the startup time of the compile script. The GitHub App starts the script for every event, so for a
+small pull request the startup is a large part of the total time. Every command runs the given amount of times
+in a new interpreter, the minimum and median wall time are reported, together with the time on top of an empty
+interpreter. Use --importtime to find the slowest imports of a compile.
+"""
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the startup time of the compile script.")
+    parser.add_argument('--runs', type=int, default=20, help='Amount of times every command is started.')
+    parser.add_argument('--importtime', type=int, default=0, help='Also print this amount of slowest imports of a compile.')
+    parser.add_argument('--output', help='Write the results to this JSON file.')
+    args = parser.parse_args()
+
+    results = {'runs': args.runs, 'commands': {}}
+    for name, arguments in COMMANDS.items():
+        results['commands'][name] = measureCommand(arguments, args.runs)
+
+    interpreter = results['commands']['interpreter']['minSeconds']
+    for name, command in results['commands'].items():
+        command['overheadSeconds'] = command['minSeconds'] - interpreter
+        print(f"{name:<16} min {command['minSeconds'] * 1000:8.1f} ms   median {command['medianSeconds'] * 1000:8.1f} ms   overhead {command['overheadSeconds'] * 1000:8.1f} ms")
+
+    if args.importtime:
+        results['slowestImports'] = getSlowestImports(args.importtime)
+        print()
+        for entry in results['slowestImports']:
+            print(f"{entry['module']:<40} {entry['cumulativeMicroseconds'] / 1000:8.1f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()